@@ -0,0 +1,221 @@
+"""Mobility, pawn structure and king safety terms computed on bitboards, for one position or for many with NumPy."""
+from typing import Any, Callable, Optional
+
+import chess
+
+from engines.IncrementalEvaluator import SQUARE_SCORES, evaluate
+
+try:
+    import numpy  # type: ignore[import-not-found, unused-ignore]
+except ImportError:
+    numpy = None  # type: ignore[assignment, unused-ignore]
+
+# A bitboard, or a NumPy array of uint64 bitboards. The shared terms below work on either.
+Bitboards = Any
+# Counts the set bits of Bitboards: chess.popcount for an int, batch_popcount for an array.
+Popcount = Callable[[Any], Any]
+Direction = tuple[int, int]
+
+# The colors in index order, so a list built over them can be indexed by color like board.occupied_co.
+BY_COLOR = (chess.BLACK, chess.WHITE)
+
+NOT_FILE_A = chess.BB_ALL ^ chess.BB_FILE_A
+NOT_FILE_H = chess.BB_ALL ^ chess.BB_FILE_H
+NOT_FILES_AB = NOT_FILE_A & (chess.BB_ALL ^ chess.BB_FILE_B)
+NOT_FILES_GH = NOT_FILE_H & (chess.BB_ALL ^ chess.BB_FILE_G)
+
+# (shift, mask) pairs. A positive shift moves bits towards h8. The mask removes bits that wrapped around the board edge.
+NORTH, SOUTH, EAST, WEST = (8, chess.BB_ALL), (-8, chess.BB_ALL), (1, NOT_FILE_A), (-1, NOT_FILE_H)
+NORTH_EAST, NORTH_WEST, SOUTH_EAST, SOUTH_WEST = (9, NOT_FILE_A), (7, NOT_FILE_H), (-7, NOT_FILE_A), (-9, NOT_FILE_H)
+KING_DIRECTIONS = [NORTH, SOUTH, EAST, WEST, NORTH_EAST, NORTH_WEST, SOUTH_EAST, SOUTH_WEST]
+KNIGHT_DIRECTIONS = [(17, NOT_FILE_A), (15, NOT_FILE_H), (10, NOT_FILES_AB), (6, NOT_FILES_GH),
+                     (-6, NOT_FILES_AB), (-10, NOT_FILES_GH), (-15, NOT_FILE_A), (-17, NOT_FILE_H)]
+SLIDER_DIRECTIONS = {
+    chess.BISHOP: [NORTH_EAST, NORTH_WEST, SOUTH_EAST, SOUTH_WEST],
+    chess.ROOK: [NORTH, SOUTH, EAST, WEST],
+    chess.QUEEN: KING_DIRECTIONS,
+}
+
+# Centipawns per square a piece attacks that is not occupied by its own side.
+MOBILITY_WEIGHTS = {chess.KNIGHT: 4, chess.BISHOP: 4, chess.ROOK: 2, chess.QUEEN: 1}
+DOUBLED_PAWN_PENALTY = 15
+ISOLATED_PAWN_PENALTY = 10
+# Passed pawn bonus by rank, counted from the pawn's own side.
+PASSED_PAWN_BONUS = [0, 5, 10, 20, 35, 60, 100, 0]
+# Own pawns on the three files around the king, one and two ranks in front of it.
+PAWN_SHIELD_BONUS = [10, 5]
+# Penalty per square next to the king attacked by an enemy knight, bishop, rook or queen.
+KING_ZONE_ATTACK_PENALTY = 8
+
+
+def shift(bitboards: Bitboards, direction: Direction) -> Bitboards:
+    """
+    Move every bit one step in a direction, dropping the bits that leave the board.
+
+    :param bitboards: An int or a NumPy array of uint64 bitboards, so the two evaluation paths share these terms.
+    :param direction: A (shift, mask) pair like NORTH.
+    """
+    amount, mask = direction
+    if amount > 0:
+        return (bitboards << amount) & mask
+    return (bitboards >> -amount) & mask
+
+
+def fill(bitboards: Bitboards, direction: Direction) -> Bitboards:
+    """Smear every bit along a file (direction is NORTH or SOUTH) to the edge of the board."""
+    amount, mask = direction
+    for step in (1, 2, 4):
+        bitboards = bitboards | shift(bitboards, (amount * step, mask))
+    return bitboards
+
+
+def king_attacks(kings: Bitboards) -> Bitboards:
+    """Get the squares next to the kings."""
+    attacks = shift(kings, KING_DIRECTIONS[0])
+    for direction in KING_DIRECTIONS[1:]:
+        attacks = attacks | shift(kings, direction)
+    return attacks
+
+
+def pawn_structure_score(own_pawns: Bitboards, their_pawns: Bitboards, color: chess.Color, popcount: Popcount) -> Any:
+    """Score the doubled, isolated and passed pawns of one side."""
+    forward, backward = (NORTH, SOUTH) if color == chess.WHITE else (SOUTH, NORTH)
+    files = fill(own_pawns, NORTH) | fill(own_pawns, SOUTH)
+    neighbour_files = shift(files, EAST) | shift(files, WEST)
+    isolated = own_pawns & (neighbour_files ^ chess.BB_ALL)
+    doubled = own_pawns & fill(shift(own_pawns, forward), forward)
+
+    # Squares in front of an enemy pawn (from its side) on its own and neighbouring files. A pawn outside them is passed.
+    their_front = fill(shift(their_pawns, backward), backward)
+    blocked = their_front | shift(their_front, EAST) | shift(their_front, WEST)
+    passed = own_pawns & (blocked ^ chess.BB_ALL)
+
+    score = -DOUBLED_PAWN_PENALTY * popcount(doubled) - ISOLATED_PAWN_PENALTY * popcount(isolated)
+    for rank in range(1, 7):
+        relative_rank = rank if color == chess.WHITE else 7 - rank
+        score = score + PASSED_PAWN_BONUS[relative_rank] * popcount(passed & chess.BB_RANKS[rank])
+    return score
+
+
+def king_safety_score(king: Bitboards, own_pawns: Bitboards, their_attacks: Bitboards, color: chess.Color,
+                      popcount: Popcount) -> Any:
+    """Score the pawn shield in front of one side's king and the enemy attacks next to it."""
+    forward = NORTH if color == chess.WHITE else SOUTH
+    front = shift(king, forward)
+    front = front | shift(front, EAST) | shift(front, WEST)
+    score = (PAWN_SHIELD_BONUS[0] * popcount(own_pawns & front)
+             + PAWN_SHIELD_BONUS[1] * popcount(own_pawns & shift(front, forward)))
+    return score - KING_ZONE_ATTACK_PENALTY * popcount(their_attacks & king_attacks(king))
+
+
+def structure_score(pawns: list[Bitboards], kings: list[Bitboards], attacks: list[Bitboards], popcount: Popcount) -> Any:
+    """Score the pawn structure and king safety from white's point of view. Each list is indexed by color."""
+    score: Any = 0
+    for color in chess.COLORS:
+        sign = 1 if color == chess.WHITE else -1
+        color_score = (pawn_structure_score(pawns[color], pawns[not color], color, popcount)
+                       + king_safety_score(kings[color], pawns[color], attacks[not color], color, popcount))
+        score = score + sign * color_score
+    return score
+
+
+def positional_score(board: chess.Board) -> int:
+    """Mobility, pawn structure and king safety of a position from white's point of view."""
+    score = 0
+    attacks = [0, 0]
+    for color in chess.COLORS:
+        not_own = board.occupied_co[color] ^ chess.BB_ALL
+        mobility = 0
+        for piece_type, weight in MOBILITY_WEIGHTS.items():
+            for square in chess.scan_forward(board.pieces_mask(piece_type, color)):
+                piece_attacks = board.attacks_mask(square)
+                attacks[color] |= piece_attacks
+                mobility += weight * chess.popcount(piece_attacks & not_own)
+        score += mobility if color == chess.WHITE else -mobility
+
+    pawns = [board.pieces_mask(chess.PAWN, color) for color in BY_COLOR]
+    kings = [board.pieces_mask(chess.KING, color) for color in BY_COLOR]
+    structure: int = structure_score(pawns, kings, attacks, chess.popcount)
+    return score + structure
+
+
+def evaluate_position(board: chess.Board) -> int:
+    """Material, piece-square, mobility, pawn structure and king safety score from white's point of view."""
+    return evaluate(board) + positional_score(board)
+
+
+def board_bitboards(board: chess.Board) -> list[int]:
+    """Get the twelve piece bitboards of a position, white pawn to king then black pawn to king, for evaluate_batch."""
+    return [board.pieces_mask(piece_type, color) for color in (chess.WHITE, chess.BLACK) for piece_type in chess.PIECE_TYPES]
+
+
+def batch_popcount(bitboards: Bitboards) -> Any:
+    """Count the set bits of each bitboard in a NumPy array."""
+    if hasattr(numpy, "bitwise_count"):
+        return numpy.bitwise_count(bitboards).astype(numpy.int64)
+    bits = numpy.unpackbits(bitboards.astype("<u8").view(numpy.uint8).reshape(-1, 8), axis=1)
+    return bits.sum(axis=1, dtype=numpy.int64)
+
+
+def ray_attacks(sliders: Bitboards, empty: Bitboards, direction: Direction) -> Bitboards:
+    """
+    Get the squares the sliding pieces attack in one direction.
+
+    Dumb7fill: flood along the ray through empty squares, then one more step onto the first blocker.
+    """
+    flood = sliders
+    for _ in range(6):
+        flood = flood | (shift(flood, direction) & empty)
+    return shift(flood, direction)
+
+
+def evaluate_batch(bitboards: Any) -> Any:
+    """
+    Score many positions at once with the same terms as evaluate_position.
+
+    `bitboards` is an array of shape (positions, 12) of the bitboards from board_bitboards. Needs NumPy.
+    """
+    if numpy is None or SQUARE_SCORE_ARRAY is None:
+        raise ImportError("evaluate_batch needs NumPy. Install it with `pip install numpy`.")
+
+    bitboards = numpy.asarray(bitboards, dtype=numpy.uint64).reshape(-1, 12)
+    count = len(bitboards)
+    bits = numpy.unpackbits(bitboards.astype("<u8").view(numpy.uint8).reshape(count, 12, 8), axis=2, bitorder="little")
+    scores = numpy.einsum("nps,ps->n", bits.astype(numpy.int64), SQUARE_SCORE_ARRAY)
+
+    first_column = {chess.WHITE: 0, chess.BLACK: 6}
+    pieces = {color: [bitboards[:, first_column[color] + piece_type - 1] for piece_type in chess.PIECE_TYPES]
+              for color in chess.COLORS}
+    occupied = {color: numpy.bitwise_or.reduce(bitboards[:, first_column[color]:first_column[color] + 6], axis=1)
+                for color in chess.COLORS}
+    empty = (occupied[chess.WHITE] | occupied[chess.BLACK]) ^ chess.BB_ALL
+
+    attacks = [numpy.zeros(count, dtype=numpy.uint64) for _ in BY_COLOR]
+    for color in chess.COLORS:
+        sign = 1 if color == chess.WHITE else -1
+        not_own = occupied[color] ^ chess.BB_ALL
+        for piece_type, weight in MOBILITY_WEIGHTS.items():
+            movers = pieces[color][piece_type - 1]
+            for direction in SLIDER_DIRECTIONS.get(piece_type, KNIGHT_DIRECTIONS):
+                if piece_type == chess.KNIGHT:
+                    piece_attacks = shift(movers, direction)
+                else:
+                    piece_attacks = ray_attacks(movers, empty, direction)
+                attacks[color] |= piece_attacks
+                # Attacks from different pieces in one direction never overlap, so this counts each piece's squares.
+                scores += sign * weight * batch_popcount(piece_attacks & not_own)
+
+    pawns = [pieces[color][chess.PAWN - 1] for color in BY_COLOR]
+    kings = [pieces[color][chess.KING - 1] for color in BY_COLOR]
+    return scores + structure_score(pawns, kings, attacks, batch_popcount)
+
+
+def build_square_score_array() -> Optional[Any]:
+    """Stack the square scores of the twelve pieces for evaluate_batch, or return None without NumPy."""
+    if numpy is None:
+        return None
+    return numpy.array([SQUARE_SCORES[color][piece_type]
+                        for color in (chess.WHITE, chess.BLACK) for piece_type in chess.PIECE_TYPES], dtype=numpy.int64)
+
+
+SQUARE_SCORE_ARRAY = build_square_score_array()
@@ -1,262 +1,872 @@
 # https://github.com/DBC201/chess-ai-python/blob/master/ChessAi.py
+"""ChessAi, the homemade engine behind `HomemadeChessAiWrapper`."""
 import chess
+import chess.engine
+import chess.polyglot
+import concurrent.futures
+import logging
+import multiprocessing
+import array
 import random
+import threading
+import time
+from typing import Iterable, Optional, Sequence, TYPE_CHECKING
 
-CENTER_SQUARES = [chess.D4, chess.D5, chess.E4, chess.E5]
+from engines.BitboardEvaluation import positional_score
+from engines.IncrementalEvaluator import IncrementalEvaluator, PIECE_VALUES, SQUARE_SCORES
+from lib.time_management import TimeManager
+from engines.TranspositionTable import TranspositionTable, TTEntry, EXACT, LOWER_BOUND, UPPER_BOUND
+if TYPE_CHECKING:
+    from engines.OpeningCache import OpeningCache, OpeningCacheEntry
 
-BOTTOM_EDGE_SQUARES = [chess.A1, chess.B1, chess.C1, chess.D1, chess.E1, chess.F1, chess.G1, chess.H1]
-TOP_EDGE_SQUARES = [chess.A8, chess.B8, chess.C8, chess.D8, chess.E8, chess.F8, chess.G8, chess.H8]
-
-LEFT_EDGE_SQUARES = [chess.A1, chess.A2, chess.A3, chess.A4, chess.A5, chess.A6, chess.A7, chess.A8]
-RIGHT_EDGE_SQUARES = [chess.H1, chess.H2, chess.H3, chess.H4, chess.H5, chess.H6, chess.H7, chess.H8]
-
-EDGE_SQUARES = [chess.A1, chess.A2, chess.A3, chess.A4, chess.A5, chess.A6, chess.A7, chess.A8,
-                chess.H1, chess.H2, chess.H3, chess.H4, chess.H5, chess.H6, chess.H7, chess.H8,
-                chess.B1, chess.C1, chess.D1, chess.E1, chess.F1, chess.G1, chess.B8, chess.C8,
-                chess.D8, chess.E8, chess.F8, chess.G8]
+logger = logging.getLogger(__name__)
 
 WHITE_WIN_SCORE = 100_000
 BLACK_WIN_SCORE = -100_000
 
-
-def calculate_manhattan_distance(square_index1, square_index2):
-    # Convert square indices to coordinates
-    x1, y1 = square_index1 % 8, square_index1 // 8
-    x2, y2 = square_index2 % 8, square_index2 // 8
-    # Calculate Manhattan distance
-    return abs(x1 - x2) + abs(y1 - y2)
-
-
-def calculate_distance_to_center(square_index):
-    return min(calculate_manhattan_distance(square_index, center_square_index) for center_square_index in CENTER_SQUARES)
-
-
-def calculate_distance_to_edge(square_index, edge_squares):
-    return min(calculate_manhattan_distance(square_index, edge_square_index) for edge_square_index in edge_squares)
+MAX_SEARCH_DEPTH = 64
+# How often (in nodes) the search checks whether it has run out of time.
+TIME_CHECK_INTERVAL = 1024
+
+# Move ordering: the hash move, then captures and promotions by most valuable victim/least valuable attacker, then the
+# killer moves of the ply, then quiet moves by history score and piece-square gain.
+HASH_MOVE_SCORE = 1_000_000
+CAPTURE_SCORE = 200_000
+KILLER_SCORE = 100_000
+HISTORY_LIMIT = 50_000
+
+# Quiescence search: how many captures past the search depth to follow, and how far a capture has to fall short of
+# alpha (after winning the captured piece) before it is skipped.
+MAX_QUIESCENCE_DEPTH = 8
+DELTA_MARGIN = 200
+# The mobility, pawn structure and king safety terms are only added when the material and piece-square score is within
+# this margin of the search window, since they rarely add up to more.
+LAZY_EVALUATION_MARGIN = 200
+
+# Legal move lists kept for nodes with at least MOVE_CACHE_MIN_DEPTH plies left, which are searched again by later
+# iterations. The moves are kept encoded (see encode_move) in an array of 16-bit ints, about 300 bytes a position with
+# the dict entry, and the cache is emptied when it holds MOVE_CACHE_ENTRIES_PER_MB positions per MB of Hash.
+MOVE_CACHE_ENTRIES_PER_MB = 1000
+MOVE_CACHE_MIN_DEPTH = 2
+# Null-move pruning: how many plies the search after passing is reduced by, and the shallowest depth it is tried at.
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 3
+# Late move reductions: the first moves of the ordering are always searched to full depth. Quiet moves after them are
+# reduced by one ply, and by two from LMR_LATE_MOVE_INDEX on.
+LMR_FULL_DEPTH_MOVES = 3
+LMR_LATE_MOVE_INDEX = 8
+LMR_MIN_DEPTH = 3
+# Aspiration windows: half the width of the first window around the previous iteration's score, and the first depth
+# they are used at. The window grows by ASPIRATION_GROWTH on the side that fails.
+ASPIRATION_WINDOW = 50
+ASPIRATION_GROWTH = 4
+ASPIRATION_MIN_DEPTH = 3
+# Settings of a ChessAi that the worker processes of parallel_search copy.
+SEARCH_OPTIONS = ("positional_evaluation", "null_move_pruning", "late_move_reductions", "principal_variation_search",
+                  "aspiration_windows")
+
+# The soft and hard deadlines of a search (see ChessAi.deadlines), as times since the epoch.
+Deadlines = tuple[Optional[float], Optional[float]]
+# The score and principal variation of every completed iteration of a search.
+DepthResults = list[tuple[int, list[chess.Move]]]
+
+
+def encode_move(move: chess.Move) -> int:
+    """Pack a move into an int: the from square, the to square shifted by 6, and the promotion shifted by 12."""
+    return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+
+def decode_move(value: int) -> chess.Move:
+    """Unpack a move packed by `encode_move`."""
+    return chess.Move(value & 63, value >> 6 & 63, value >> 12 or None)
 
 
 class Node:
-    def __init__(self, board: chess.Board, piece_score):
-        self.game = chess.Board(board.fen())
-
-        self.piece_score = piece_score
-        self.eval_score = None
-
-        self.parent = None
-        self.children = []
-
-        self.depth = 0
-
-        self.piece_values = {
-            chess.PAWN: 100,
-            chess.KNIGHT: 300,
-            chess.BISHOP: 300,
-            chess.ROOK: 500,
-            chess.QUEEN: 800,
-            chess.KING: 0
-        }
-
-    def add_parent(self, parent):
-        self.parent = parent
-        parent.children.append(self)
-        self.depth = parent.depth + 1
+    """
+    One move of the principal variation that is kept after a search.
 
-    def get_score(self):
-        if self.game.is_checkmate():
-            self.eval_score = WHITE_WIN_SCORE if self.game.turn == chess.BLACK else BLACK_WIN_SCORE
-            return self.eval_score
+    There is no board, the move is stored as an int (see `encode_move`) and only the next move of the variation is
+    linked, so a node is a few machine words.
+    """
 
-        if self.game.is_stalemate():
-            self.eval_score = 0
-            return self.eval_score
+    __slots__ = ("move", "score", "child")
 
-        if self.eval_score is not None:
-            return self.eval_score
-        else:
-            return self.piece_score
+    def __init__(self, move: int, score: int, child: Optional["Node"] = None) -> None:
+        """Link a move of the principal variation to its score and to the next move."""
+        self.move = move
+        self.score = score
+        self.child = child
 
-    def get_ordered_moves(self, shuffle=False):
-        moves = list(self.game.legal_moves)
+    @classmethod
+    def from_pv(cls, pv: Sequence[chess.Move], score: int) -> Optional["Node"]:
+        """Build the linked nodes of a principal variation, or None if it is empty."""
+        node: Optional[Node] = None
+        for move in reversed(pv):
+            node = cls(encode_move(move), score, node)
+        return node
 
-        has_capture = False
-        group_by_score_change = {}
+    def best_move(self) -> chess.Move:
+        """Get the move of this node."""
+        return decode_move(self.move)
 
-        for move in moves:
-            score_change = 0
-            if self.game.is_capture(move):
-                if len(self.game.move_stack) > 0 and self.game.peek().to_square == move.to_square:
-                    prev_move = self.game.pop()
-                    if self.game.is_capture(prev_move):
-                        has_capture = True
-                    self.game.push(prev_move)
 
-                piece = self.game.piece_at(move.to_square)
-                if piece is None: # en passant
-                    score_change += self.piece_values[chess.PAWN]
-                else:
-                    score_change += self.piece_values[piece.piece_type]
+def capture_gain(board: chess.Board, move: chess.Move) -> int:
+    """Get the material a capture or promotion wins, ignoring what may be lost afterwards."""
+    gain = PIECE_VALUES[board.piece_type_at(move.to_square) or chess.PAWN] if board.is_capture(move) else 0
+    if move.promotion:
+        gain += PIECE_VALUES[move.promotion] - PIECE_VALUES[chess.PAWN]
+    return gain
 
-            pieces = self.game.piece_map()
 
-            if len(pieces) > 28:
-                piece = self.game.piece_at(move.from_square)
+def narrow_window(entry: TTEntry, alpha: int, beta: int) -> tuple[int, int]:
+    """Narrow the search window with a stored result."""
+    # An exact score closes the window; a bound only moves one side of it.
+    if entry.flag == EXACT:
+        return entry.score, entry.score
+    elif entry.flag == LOWER_BOUND:
+        return max(alpha, entry.score), beta
+    return alpha, min(beta, entry.score)
 
-                old_distance_to_center = calculate_distance_to_center(move.to_square)
 
-                new_distance_to_center = calculate_distance_to_center(move.from_square)
+def bound_flag(score: int, alpha: int, beta: int) -> int:
+    """Tell whether a score found with the window (alpha, beta) is exact, a lower bound or an upper bound."""
+    if score <= alpha:
+        return UPPER_BOUND
+    elif score >= beta:
+        return LOWER_BOUND
+    return EXACT
 
-                if piece.piece_type == chess.PAWN or piece.piece_type == chess.KNIGHT or piece.piece_type == chess.BISHOP:
-                    score_change += (new_distance_to_center - old_distance_to_center) * 10
-            elif 20 < len(pieces) <= 28:
-                if self.game.is_check():
-                    score_change += 5
 
-                old_attack_count = self.game.attacks(move.from_square)
-                new_attack_count = self.game.attacks(move.to_square)
+def is_mate_score(score: int) -> bool:
+    """Whether a score is a forced mate for either side."""
+    return score >= WHITE_WIN_SCORE or score <= BLACK_WIN_SCORE
 
-                score_change += (len(new_attack_count) - len(old_attack_count))
 
-                piece = self.game.piece_at(move.from_square)
+def is_draw_by_rule(board: chess.Board) -> bool:
+    """Whether the position is drawn by insufficient material, the 75-move rule or fivefold repetition."""
+    # The draws board.outcome() finds without generating moves. Claimable draws are left to the opponent.
+    return board.is_insufficient_material() or board.is_seventyfive_moves() or board.is_fivefold_repetition()
 
-                if piece.piece_type == chess.PAWN:
-                    edge_squares = TOP_EDGE_SQUARES if piece.color == chess.WHITE else BOTTOM_EDGE_SQUARES
-                    old_distance_to_edge = calculate_distance_to_edge(move.to_square, edge_squares)
-                    new_distance_to_edge = calculate_distance_to_edge(move.from_square, edge_squares)
 
-                    score_change += (new_distance_to_edge - old_distance_to_edge) * 10
-                elif piece.piece_type == chess.KING:
-                    old_distance_to_edge = min(calculate_distance_to_edge(move.to_square, LEFT_EDGE_SQUARES),
-                                               calculate_distance_to_edge(move.to_square, RIGHT_EDGE_SQUARES))
-                    new_distance_to_edge = min(calculate_distance_to_edge(move.from_square, LEFT_EDGE_SQUARES),
-                                                  calculate_distance_to_edge(move.from_square, RIGHT_EDGE_SQUARES))
+def no_moves_score(board: chess.Board, in_check: bool) -> int:
+    """Get the score of a position without legal moves."""
+    # Checkmate, or stalemate.
+    if not in_check:
+        return 0
+    return BLACK_WIN_SCORE if board.turn == chess.WHITE else WHITE_WIN_SCORE
 
-                    score_change += (new_distance_to_edge - old_distance_to_edge) * 10
-            else:
-                piece = self.game.piece_at(move.from_square)
-
-                if self.game.is_check():
-                    score_change += 5
-
-                if piece.piece_type == chess.KING:
-                    old_distance_to_edge = min(calculate_distance_to_edge(move.to_square, LEFT_EDGE_SQUARES),
-                                               calculate_distance_to_edge(move.to_square, RIGHT_EDGE_SQUARES),
-                                               calculate_distance_to_edge(move.to_square, TOP_EDGE_SQUARES),
-                                               calculate_distance_to_edge(move.to_square, BOTTOM_EDGE_SQUARES))
-                    new_distance_to_edge = min(calculate_distance_to_edge(move.from_square, LEFT_EDGE_SQUARES),
-                                               calculate_distance_to_edge(move.from_square, RIGHT_EDGE_SQUARES),
-                                               calculate_distance_to_edge(move.from_square, TOP_EDGE_SQUARES),
-                                               calculate_distance_to_edge(move.from_square, BOTTOM_EDGE_SQUARES))
-
-                    score_change += (old_distance_to_edge - new_distance_to_edge) * 25
-                elif piece.piece_type == chess.PAWN:
-                    edge_squares = TOP_EDGE_SQUARES if piece.color == chess.WHITE else BOTTOM_EDGE_SQUARES
-                    old_distance_to_edge = calculate_distance_to_edge(move.to_square, edge_squares)
-                    new_distance_to_edge = calculate_distance_to_edge(move.from_square, edge_squares)
-
-                    score_change += (new_distance_to_edge - old_distance_to_edge) * 25
-
-            if score_change in group_by_score_change:
-                group_by_score_change[score_change].append(move)
-            else:
-                group_by_score_change[score_change] = [move]
 
-        ordered_moves = []
+class SearchTimeout(Exception):
+    """Raised inside the search when it runs out of time or nodes, or is told to stop."""
 
-        for score_change, moves in group_by_score_change.items():
-            if shuffle:
-                random.shuffle(moves)
-            for move in moves:
-                ordered_moves.append((move, score_change))
-
-        ordered_moves.sort(key=lambda x: x[1], reverse=True)
-
-        return ordered_moves, has_capture
-
-    def eval(self):
-        if self.game.is_checkmate():
-            self.eval_score = WHITE_WIN_SCORE if self.game.turn == chess.WHITE else BLACK_WIN_SCORE
-            return
-
-        if self.game.is_stalemate():
-            self.eval_score = 0
-            return
-
-        pieces = self.game.piece_map()
-        self.eval_score = 0
-        for square, piece in pieces.items():
-            if piece.color == chess.WHITE:
-                self.eval_score += self.piece_values[piece.piece_type]
-            else:
-                self.eval_score -= self.piece_values[piece.piece_type]
+    pass
 
 
 class ChessAi:
-    def __init__(self, max_depth=3):
+    """An alpha-beta search with iterative deepening, a transposition table, and pondering."""
+
+    def __init__(self, max_depth: int = 3, hash_size_mb: float = 16, threads: int = 1, positional_evaluation: bool = True,
+                 null_move_pruning: bool = True, late_move_reductions: bool = True, principal_variation_search: bool = True,
+                 aspiration_windows: bool = True, opening_cache: Optional["OpeningCache"] = None) -> None:
+        """Set up the search options and the state kept between the moves of a game."""
         self.max_depth = max_depth
+        self.positional_evaluation = positional_evaluation
+        self.null_move_pruning = null_move_pruning
+        self.late_move_reductions = late_move_reductions
+        self.principal_variation_search = principal_variation_search
+        self.aspiration_windows = aspiration_windows
+        self.threads = threads
+        self.executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self.root_moves: Optional[list[chess.Move]] = None
+        self.depth_results: DepthResults = []
+        self.stop_event: Optional[threading.Event] = None
+        self.ponder_move: Optional[chess.Move] = None
+        self.ponder_result: Optional[tuple[int, int, int, list[chess.Move]]] = None
+
+        # Search state kept between the moves of a game.
+        self.game_id: Optional[str] = None
+        self.search_position: Optional[tuple[str, list[chess.Move]]] = None
+        self.previous_pv: list[chess.Move] = []
+        self.pv_move: Optional[chess.Move] = None
+        self.cache: Optional[Node] = None
+        self.cache_key: Optional[int] = None
+        self.cache_depth = 0
+        # An OpeningCache, which may be shared with the other ChessAi instances of the process.
+        self.opening_cache = opening_cache
+        self.transposition_table = TranspositionTable(hash_size_mb)
+        self.move_cache: dict[int, array.array[int]] = {}
+        self.nodes = 0
+        self.pv_table: list[list[chess.Move]] = []
+        self.evaluator = IncrementalEvaluator()
+
+        self.search_depth = max_depth
+        self.time_manager = TimeManager()
+        self.soft_deadline: Optional[float] = None
+        self.deadline: Optional[float] = None
+        self.max_nodes: Optional[int] = None
+
+        self.killers: list[list[Optional[chess.Move]]] = []
+        self.history = [[0] * 4096, [0] * 4096]
+        self.nodes_per_depth: list[int] = []
+        self.seldepth = 0
+        self.info: chess.engine.InfoDict = {}
+
+    def clear_move_ordering(self) -> None:
+        """Forget the killer moves and history scores."""
+        self.killers = [[None, None] for _ in range(MAX_SEARCH_DEPTH)]
+        self.history = [[0] * 4096, [0] * 4096]
+
+    def new_game(self, game_id: Optional[str] = None) -> None:
+        """Forget everything kept from the previous game."""
+        self.game_id = game_id
         self.cache = None
+        self.ponder_result = None
+        self.transposition_table.clear()
+        self.move_cache = {}
+        self.clear_move_ordering()
+        self.search_position = None
+        self.previous_pv = []
+        self.pv_move = None
+
+    def age_move_ordering(self, board: chess.Board) -> None:
+        """Carry the killer moves and history scores over from the last search to a search of `board`."""
+        # Killers are stored by distance from the root, so they move up by the number of plies played since the last
+        # search. The history scores are halved so recent cutoffs count more. If the board does not follow on from the
+        # last search (a new game or a takeback), start over.
+        search_position = (board.root().fen(), list(board.move_stack))
+        plies_played = -1
+        if self.search_position is not None:
+            root_fen, move_stack = self.search_position
+            if root_fen == search_position[0] and board.move_stack[:len(move_stack)] == move_stack:
+                plies_played = len(board.move_stack) - len(move_stack)
+
+        if 0 <= plies_played < len(self.killers):
+            self.killers = self.killers[plies_played:] + [[None, None] for _ in range(plies_played)]
+            for color_history in self.history:
+                for i in range(len(color_history)):
+                    color_history[i] //= 2
+        else:
+            self.clear_move_ordering()
 
-    def alpha_beta_pruning(self, root: Node, alpha: int, beta: int, multiple_moves_flag: bool) -> None:
-        ordered_moves, has_capture = root.get_ordered_moves(multiple_moves_flag)
-
-        if root.game.is_game_over():
-            return
-        elif root.depth >= self.max_depth and not has_capture:
+        # The move the last principal variation expects here, in case its hash entry has been replaced since.
+        played = board.move_stack[len(board.move_stack) - plies_played:] if plies_played >= 0 else None
+        if plies_played < len(self.previous_pv) and played == self.previous_pv[:plies_played]:
+            self.pv_move = self.previous_pv[plies_played]
+        else:
+            self.pv_move = None
+        self.search_position = search_position
+
+    def legal_moves(self, board: chess.Board, key: int, depth: int) -> list[chess.Move]:
+        """Get the legal moves of a node, from the move cache when it has been searched before."""
+        # Nodes with more than one ply left are searched again by every later iteration, so their moves are kept.
+        if depth < MOVE_CACHE_MIN_DEPTH:
+            return list(board.generate_legal_moves())
+        encoded_moves = self.move_cache.get(key)
+        if encoded_moves is not None:
+            return [decode_move(value) for value in encoded_moves]
+        if len(self.move_cache) >= self.transposition_table.size_mb * MOVE_CACHE_ENTRIES_PER_MB:
+            self.move_cache.clear()
+        moves = list(board.generate_legal_moves())
+        self.move_cache[key] = array.array("H", map(encode_move, moves))
+        return moves
+
+    def order_moves(self, board: chess.Board, ply: int, hash_move: Optional[chess.Move], shuffle: bool,
+                    moves: Optional[Iterable[chess.Move]] = None) -> list[chess.Move]:
+        """Sort the moves so the ones most likely to cause a cutoff are searched first."""
+        moves = list(board.generate_legal_moves() if moves is None else moves)
+        if ply == 0:
+            hash_move = hash_move or self.pv_move
+            if self.root_moves is not None:
+                moves = [move for move in moves if move in self.root_moves]
+        if shuffle:
+            # Moves with equal ordering scores are tried in a random order so the bot does not always play the same game.
+            random.shuffle(moves)
+
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history[board.turn]
+        square_scores = SQUARE_SCORES[board.turn]
+        sign = 1 if board.turn == chess.WHITE else -1
+        them = board.occupied_co[not board.turn]
+        ep_square = board.ep_square
+
+        def move_score(move: chess.Move) -> int:
+            if move == hash_move:
+                return HASH_MOVE_SCORE
+            from_square, to_square = move.from_square, move.to_square
+            if them & chess.BB_SQUARES[to_square]:
+                victim = board.piece_type_at(to_square) or 0
+            elif to_square == ep_square and board.is_en_passant(move):
+                victim = chess.PAWN
+            else:
+                victim = 0
+            if victim or move.promotion:
+                return CAPTURE_SCORE + (victim + (move.promotion or 0)) * 8 - (board.piece_type_at(from_square) or 0)
+            if move in killers:
+                return KILLER_SCORE - killers.index(move)
+            piece_scores = square_scores[board.piece_type_at(from_square) or 0]
+            return history[from_square * 64 + to_square] + sign * (piece_scores[to_square] - piece_scores[from_square])
+
+        moves.sort(key=move_score, reverse=True)
+        return moves
+
+    def update_move_ordering(self, board: chess.Board, ply: int, move: chess.Move, depth: int) -> None:
+        """Remember a quiet move that caused a beta cutoff as a killer and in the history scores."""
+        # Called when a move causes a beta cutoff. Captures and promotions are already ordered first.
+        if move.promotion or board.is_capture(move):
             return
 
-        if root.game.turn == chess.WHITE:
-            max_score = BLACK_WIN_SCORE - 1
-            for move, score_change in ordered_moves:
-                child = Node(root.game, root.get_score() + score_change)
-                child.add_parent(root)
-                child.game.push(move)
-                self.alpha_beta_pruning(child, alpha, beta, multiple_moves_flag)
-
-                max_score = max(max_score, child.get_score())
-
-                alpha = max(alpha, max_score)
+        if ply < len(self.killers):
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+
+        history = self.history[board.turn]
+        index = move.from_square * 64 + move.to_square
+        history[index] += max(1, depth) ** 2
+        if history[index] > HISTORY_LIMIT:
+            for color_history in self.history:
+                for i in range(len(color_history)):
+                    color_history[i] //= 2
+
+    def count_node(self, ply: int) -> None:
+        """Count a searched node and check the search limits every `TIME_CHECK_INTERVAL` nodes."""
+        self.nodes += 1
+        if ply > self.seldepth:
+            self.seldepth = ply
+        if self.nodes % TIME_CHECK_INTERVAL == 0 or self.max_nodes is not None:
+            self.check_limits()
+
+    def check_limits(self) -> None:
+        """Raise `SearchTimeout` if the search has to stop."""
+        # The first iteration always completes so there is a move to play.
+        if self.search_depth <= 1:
+            return
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            raise SearchTimeout()
+        if self.deadline is not None and time.time() >= self.deadline:
+            raise SearchTimeout()
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchTimeout()
+
+    def store_result(self, key: int, ply: int, depth: int, flag: int, score: int, move: Optional[chess.Move]) -> None:
+        """Store the result of a node in the transposition table."""
+        # A root searched over only some of its moves (see search_root_moves) has no score to share.
+        if ply > 0 or self.root_moves is None:
+            self.transposition_table.store(key, depth, flag, score, move)
+
+    def alpha_beta_pruning(self, board: chess.Board, ply: int, depth: int, alpha: int, beta: int,
+                           multiple_moves_flag: bool) -> int:
+        """Search a position to `depth` plies and get its score from White's side."""
+        # Walks a single board with push/pop through self.evaluator, which keeps the static score up to date. Only the
+        # scores are kept on the stack and the principal variation in self.pv_table. depth is the number of plies left
+        # before the quiescence search; null moves and reductions make it fall faster than ply grows.
+        self.count_node(ply)
+        if ply == len(self.pv_table):
+            self.pv_table.append([])
+        self.pv_table[ply] = []
+
+        # Checkmate and stalemate are found from the legal moves below, which are generated once per node.
+        if is_draw_by_rule(board):
+            return 0
+        in_check = board.is_check()
+        if depth <= 0:
+            return self.leaf_search(board, ply, alpha, beta, in_check)
+
+        key = chess.polyglot.zobrist_hash(board)
+        hash_move, alpha, beta, hash_score = self.probe_hash(key, ply, depth, alpha, beta)
+        if hash_score is not None:
+            return hash_score
+
+        moves = self.legal_moves(board, key, depth)
+        if not moves:
+            return no_moves_score(board, in_check)
+
+        null_move_score = self.null_move_search(board, ply, depth, alpha, beta, in_check)
+        if null_move_score is not None:
+            return null_move_score
+
+        ordered_moves = self.order_moves(board, ply, hash_move, multiple_moves_flag and ply == 0, moves)
+
+        original_alpha, original_beta = alpha, beta
+        best_move = None
+
+        white_to_move = board.turn == chess.WHITE
+        best_score = BLACK_WIN_SCORE - 1 if white_to_move else WHITE_WIN_SCORE + 1
+        for move_index, move in enumerate(ordered_moves):
+            reduction = self.reduction(board, ply, depth, move_index, move, in_check)
+            zero_window = self.principal_variation_search and move_index > 0
+            self.evaluator.push(board, move)
+            child_score = self.search_move(board, ply, depth, alpha, beta, reduction, zero_window, multiple_moves_flag)
+            self.evaluator.pop(board)
+
+            if child_score > best_score if white_to_move else child_score < best_score:
+                best_score = child_score
+                best_move = move
+                self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+
+            alpha, beta = (max(alpha, best_score), beta) if white_to_move else (alpha, min(beta, best_score))
+            if beta <= alpha:
+                self.update_move_ordering(board, ply, move, depth)
+                break
 
-                if beta <= alpha:
-                    break
-            root.eval_score = max_score
+        self.store_result(key, ply, depth, bound_flag(best_score, original_alpha, original_beta), best_score, best_move)
+
+        return best_score
+
+    def probe_hash(self, key: int, ply: int, depth: int, alpha: int,
+                   beta: int) -> tuple[Optional[chess.Move], int, int, Optional[int]]:
+        """Look up a node in the transposition table."""
+        # The hash move, the window narrowed by the stored bound, and the stored score when it cuts the node off.
+        entry = self.transposition_table.probe(key)
+        if entry is None:
+            return None, alpha, beta, None
+        if ply > 0 and entry.depth >= depth:
+            alpha, beta = narrow_window(entry, alpha, beta)
+            if beta <= alpha:
+                return entry.move, alpha, beta, entry.score
+        return entry.move, alpha, beta, None
+
+    def leaf_search(self, board: chess.Board, ply: int, alpha: int, beta: int, in_check: bool) -> int:
+        """Score a node at the end of the main search."""
+        # The quiescence search finds checkmates itself, but not stalemates. One legal move is enough to rule out
+        # stalemate, so the moves are generated lazily.
+        if not in_check and not any(board.generate_legal_moves()):
+            return 0
+        return self.quiescence(board, ply, alpha, beta, 0)
+
+    def search_move(self, board: chess.Board, ply: int, depth: int, alpha: int, beta: int, reduction: int,
+                    zero_window: bool, multiple_moves_flag: bool) -> int:
+        """Search the move just pushed on the board."""
+        # With principal variation search, every move after the first is only tested against the bound its side has to
+        # beat, with a zero width window, and searched again with the full window if it beats it. A reduced search that
+        # beats the bound is searched again to full depth.
+        white_moved = board.turn == chess.BLACK
+        if zero_window:
+            test_alpha, test_beta = (alpha, alpha + 1) if white_moved else (beta - 1, beta)
         else:
-            min_score = WHITE_WIN_SCORE + 1
-            for move, score_change in ordered_moves:
-                child = Node(root.game, root.get_score() - score_change)
-                child.add_parent(root)
-                child.game.push(move)
-                self.alpha_beta_pruning(child, alpha, beta, multiple_moves_flag)
-
-                min_score = min(min_score, child.get_score())
+            test_alpha, test_beta = alpha, beta
+
+        score = self.alpha_beta_pruning(board, ply + 1, depth - 1 - reduction, test_alpha, test_beta, multiple_moves_flag)
+        if reduction and (score > alpha if white_moved else score < beta):
+            score = self.alpha_beta_pruning(board, ply + 1, depth - 1, test_alpha, test_beta, multiple_moves_flag)
+        if zero_window and alpha < score < beta:
+            score = self.alpha_beta_pruning(board, ply + 1, depth - 1, alpha, beta, multiple_moves_flag)
+        return score
+
+    def null_move_search(self, board: chess.Board, ply: int, depth: int, alpha: int, beta: int,
+                         in_check: bool) -> Optional[int]:
+        """Try to cut a node off by letting the side to move pass."""
+        # Null-move pruning: if the side to move could pass and a reduced search still beats its bound, a real move
+        # almost always would too, so the node is cut off. Returns the bound, or None if the node has to be searched.
+        # Not tried in check, right after another null move, near a mate score, or when the side to move has only pawns
+        # left, since zugzwang (where passing would be the best move) is common in those endgames.
+        if (not self.null_move_pruning or ply == 0 or depth < NULL_MOVE_MIN_DEPTH or in_check
+                or board.move_stack[-1] == chess.Move.null()
+                or not board.occupied_co[board.turn] & ((board.pawns | board.kings) ^ chess.BB_ALL)):
+            return None
+
+        white_to_move = board.turn == chess.WHITE
+        if white_to_move:
+            if beta >= WHITE_WIN_SCORE or self.evaluator.score < beta:
+                return None
+            test_alpha, test_beta = beta - 1, beta
+        else:
+            if alpha <= BLACK_WIN_SCORE or self.evaluator.score > alpha:
+                return None
+            test_alpha, test_beta = alpha, alpha + 1
+
+        self.evaluator.push(board, chess.Move.null())
+        score = self.alpha_beta_pruning(board, ply + 1, depth - 1 - NULL_MOVE_REDUCTION, test_alpha, test_beta, False)
+        self.evaluator.pop(board)
+
+        if white_to_move and score >= beta:
+            return beta
+        elif not white_to_move and score <= alpha:
+            return alpha
+        return None
+
+    def reduction(self, board: chess.Board, ply: int, depth: int, move_index: int, move: chess.Move,
+                  in_check: bool) -> int:
+        """Get how many plies less deep a move is searched."""
+        # Late move reductions: quiet moves that the move ordering puts late are unlikely to be best, so they are
+        # searched less deeply. Captures, promotions, killers, checks and check evasions are never reduced.
+        if (not self.late_move_reductions or move_index < LMR_FULL_DEPTH_MOVES or depth < LMR_MIN_DEPTH or in_check
+                or move.promotion or board.is_capture(move)
+                or (ply < len(self.killers) and move in self.killers[ply]) or board.gives_check(move)):
+            return 0
+        return min(1 if move_index < LMR_LATE_MOVE_INDEX else 2, depth - 2)
+
+    def order_captures(self, board: chess.Board) -> list[chess.Move]:
+        """Get the captures and queen promotions searched by the quiescence search, best first."""
+        # Most valuable victim first, then least valuable attacker.
+        promotion_mask = chess.BB_RANK_7 if board.turn == chess.WHITE else chess.BB_RANK_2
+        moves = list(board.generate_legal_captures())
+        moves.extend(move for move in board.generate_legal_moves(board.pawns & promotion_mask, ~board.occupied)
+                     if move.promotion == chess.QUEEN)
+
+        def capture_score(move: chess.Move) -> int:
+            victim = board.piece_type_at(move.to_square) or (chess.PAWN if board.is_en_passant(move) else 0)
+            return (victim + (move.promotion or 0)) * 8 - (board.piece_type_at(move.from_square) or 0)
+
+        return sorted(moves, key=capture_score, reverse=True)
+
+    def static_score(self, board: chess.Board, alpha: int, beta: int) -> int:
+        """Evaluate a position without searching, from White's side."""
+        score = self.evaluator.score
+        if self.positional_evaluation and alpha - LAZY_EVALUATION_MARGIN < score < beta + LAZY_EVALUATION_MARGIN:
+            score += positional_score(board)
+        return score
+
+    def quiescence(self, board: chess.Board, ply: int, alpha: int, beta: int, quiescence_ply: int) -> int:
+        """Search the captures of a position until it is quiet."""
+        # Past the search depth only captures and queen promotions are searched, until the position is quiet. The side
+        # to move can always "stand pat" on the static score instead of capturing, except when it is in check, where
+        # every evasion is searched so mates are not missed.
+        self.count_node(ply)
+
+        stand_pat = self.static_score(board, alpha, beta)
+        if quiescence_ply >= MAX_QUIESCENCE_DEPTH:
+            return stand_pat
+
+        white_to_move = board.turn == chess.WHITE
+        in_check = board.is_check()
+        if in_check:
+            moves = list(board.generate_legal_moves())
+            if not moves:
+                return BLACK_WIN_SCORE if white_to_move else WHITE_WIN_SCORE
+            best_score = BLACK_WIN_SCORE - 1 if white_to_move else WHITE_WIN_SCORE + 1
+        elif stand_pat >= beta if white_to_move else stand_pat <= alpha:
+            return stand_pat
+        else:
+            alpha, beta = (max(alpha, stand_pat), beta) if white_to_move else (alpha, min(beta, stand_pat))
+            best_score = stand_pat
+            moves = self.order_captures(board)
 
-                beta = min(beta, min_score)
+        for move in moves:
+            # Delta pruning: skip captures that cannot bring the score back to alpha (or beta for black) even after
+            # winning the captured piece with some margin.
+            if not in_check and (stand_pat + capture_gain(board, move) + DELTA_MARGIN <= alpha if white_to_move
+                                 else stand_pat - capture_gain(board, move) - DELTA_MARGIN >= beta):
+                continue
+
+            self.evaluator.push(board, move)
+            child_score = self.quiescence(board, ply + 1, alpha, beta, quiescence_ply + 1)
+            self.evaluator.pop(board)
+
+            if white_to_move:
+                best_score = max(best_score, child_score)
+                alpha = max(alpha, best_score)
+            else:
+                best_score = min(best_score, child_score)
+                beta = min(beta, best_score)
+            if beta <= alpha:
+                break
 
-                if beta <= alpha:
-                    break
-            root.eval_score = min_score
+        return best_score
 
-    def get_move(self, board: chess.Board):
-        root = None
+    def get_move(self, board: chess.Board, time_limit: Optional[chess.engine.Limit] = None,
+                 game_id: Optional[str] = None) -> chess.Move:
+        """Find the best move in the position."""
+        if game_id != self.game_id:
+            self.new_game(game_id)
 
-        if self.cache is None or self.cache.game != board:
-            root = Node(board, None)
-            root.eval()
-            self.alpha_beta_pruning(root, BLACK_WIN_SCORE-1, WHITE_WIN_SCORE+1, True)
-        else:
+        start_time = time.time()
+        opening_entry = self.probe_opening_cache(board, time_limit)
+        root: Optional[Node]
+        if self.cache is not None and self.cache_key == chess.polyglot.zobrist_hash(board):
             root = self.cache
+            depth = self.cache_depth
+            self.nodes = 0
+            self.seldepth = 0
+            self.nodes_per_depth = []
+        elif opening_entry is not None:
+            root = Node.from_pv([move for move in (opening_entry.move, opening_entry.ponder) if move is not None],
+                                opening_entry.score)
+            depth = opening_entry.depth
+            self.nodes = 0
+            self.seldepth = 0
+            self.nodes_per_depth = []
+        else:
+            score = self.parallel_search(board, time_limit) if self.threads > 1 else None
+            if score is None:
+                score = self.iterative_deepening(board, time_limit)
+            score, depth = self.use_ponder_result(board, score, len(self.nodes_per_depth))
+            if self.opening_cache is not None and not is_mate_score(score):
+                self.opening_cache.store(board, self.pv_table[0], score, depth)
+            # Only the principal variation is kept.
+            root = Node.from_pv(self.pv_table[0], score)
+        if root is None:
+            # A position drawn by rule (e.g. by insufficient material) is not searched, so it has no variation.
+            root = Node(encode_move(self.order_moves(board, 0, None, False)[0]), 0)
+
+        next_child = root.child
+        self.ponder_move = next_child.best_move() if next_child is not None else None
+
+        # On a forced mate the rest of the line is played without searching again, as long as the opponent follows it.
+        self.cache = None
+        if is_mate_score(root.score) and next_child is not None and next_child.child is not None:
+            expected_board = board.copy(stack=False)
+            expected_board.push(root.best_move())
+            expected_board.push(next_child.best_move())
+            self.cache = next_child.child
+            self.cache_key = chess.polyglot.zobrist_hash(expected_board)
+            self.cache_depth = max(1, depth - 2)
+
+        self.info = self.search_info(board, root, depth, time.time() - start_time)
+        return root.best_move()
+
+    def probe_opening_cache(self, board: chess.Board,
+                            time_limit: Optional[chess.engine.Limit] = None) -> Optional["OpeningCacheEntry"]:
+        """Look up the position in the opening cache."""
+        # A cached result is used if it is at least as deep as the search would go. A timed search takes any result of
+        # the cache's minimum depth.
+        if self.opening_cache is None:
+            return None
+        depth: Optional[int] = self.max_depth
+        if time_limit is not None and time_limit.depth is not None:
+            depth = time_limit.depth
+        elif self.time_manager.budget(board, time_limit).hard is not None:
+            depth = None
+        return self.opening_cache.probe(board, depth)
+
+    def search_info(self, board: chess.Board, root: Node, depth: int, elapsed: float) -> chess.engine.InfoDict:
+        """Get the info of the search reported to lichess-bot."""
+        # depth is that of the search the principal variation comes from, which may be a cached one. The score is given
+        # from the side to move, like a UCI engine gives it, since lichess-bot reads it as the score of the bot.
+        pv = []
+        node: Optional[Node] = root
+        while node is not None:
+            pv.append(node.best_move())
+            node = node.child
+
+        relative_score = root.score if board.turn == chess.WHITE else -root.score
+        score: chess.engine.Score
+        if is_mate_score(root.score):
+            # The mate is delivered by the last move of the principal variation.
+            moves_to_mate = (len(pv) + 1) // 2
+            score = chess.engine.Mate(moves_to_mate if relative_score > 0 else -moves_to_mate)
+        else:
+            score = chess.engine.Cp(relative_score)
+
+        info: chess.engine.InfoDict = {
+            "depth": depth,
+            "seldepth": max(self.seldepth, len(pv)),
+            "nodes": self.nodes,
+            "time": elapsed,
+            "score": chess.engine.PovScore(score, board.turn),
+            "pv": pv,
+            "hashfull": self.transposition_table.hashfull(),
+        }
+        if elapsed > 0:
+            info["nps"] = int(self.nodes / elapsed)
+        return info
+
+    def extend_pv(self, board: chess.Board, pv: Sequence[chess.Move], depth: int) -> list[chess.Move]:
+        """Continue a principal variation with the hash moves up to `depth` moves."""
+        # A transposition table cutoff ends the principal variation early, so it is continued with the hash moves.
+        board = board.copy()
+        for move in pv:
+            board.push(move)
+        extended_pv = list(pv)
+        while len(extended_pv) < depth:
+            entry = self.transposition_table.probe(chess.polyglot.zobrist_hash(board))
+            if entry is None or entry.move is None or not board.is_legal(entry.move):
+                break
+            extended_pv.append(entry.move)
+            board.push(entry.move)
+        return extended_pv
+
+    def ponder(self, board: chess.Board, stop_event: threading.Event) -> None:
+        """Search the position expected after the opponent's reply while it is the opponent's turn."""
+        # The search runs until stop_event is set. The transposition table keeps what was found, and get_move uses the
+        # result directly if it went deeper than its own search. The opponent may play another move, so the move
+        # ordering and the position it was aged for are put back as they were, and the next search ages them from the
+        # position before pondering.
+        saved_state = (self.search_position, self.previous_pv, self.pv_move,
+                       [list(killers) for killers in self.killers], [list(history) for history in self.history])
+        self.stop_event = stop_event
+        try:
+            score = self.iterative_deepening(board, chess.engine.Limit(depth=MAX_SEARCH_DEPTH))
+        finally:
+            self.stop_event = None
+            self.search_position, self.previous_pv, self.pv_move, self.killers, self.history = saved_state
+        self.ponder_result = (chess.polyglot.zobrist_hash(board), len(self.nodes_per_depth), score, self.pv_table[0])
+
+    def use_ponder_result(self, board: chess.Board, score: int, depth: int) -> tuple[int, int]:
+        """Use the ponder search instead of the search that just finished if it went deeper."""
+        # Returns the score and depth of the deeper of the two searches.
+        if self.ponder_result is None:
+            return score, depth
+        key, ponder_depth, ponder_score, pv = self.ponder_result
+        self.ponder_result = None
+        if key == chess.polyglot.zobrist_hash(board) and ponder_depth > depth and pv:
+            self.pv_table = [pv]
+            self.previous_pv = pv
+            return ponder_score, ponder_depth
+        return score, depth
+
+    def deadlines(self, board: chess.Board, time_limit: Optional[chess.engine.Limit] = None) -> Deadlines:
+        """Get the times at which the search should stop starting iterations and should stop."""
+        # The soft deadline stops new iterations from starting, the hard deadline stops the search.
+        budget = self.time_manager.budget(board, time_limit)
+        if budget.soft is None or budget.hard is None:
+            return None, None
+        start_time = time.time()
+        return start_time + budget.soft, start_time + budget.hard
+
+    def iterative_deepening(self, board: chess.Board, time_limit: Optional[chess.engine.Limit] = None,
+                            deadlines: Optional[Deadlines] = None) -> int:
+        """Search one ply deeper each iteration until a limit is reached, and get the score."""
+        # The limit is the time, depth or node limit. An iteration that is cut short is thrown away and the result of the
+        # last completed depth is used.
+        max_depth = self.max_depth
+        self.soft_deadline, self.deadline = deadlines or self.deadlines(board, time_limit)
+        self.max_nodes = None
+        if self.deadline is not None:
+            max_depth = MAX_SEARCH_DEPTH
+        if time_limit is not None:
+            if time_limit.depth is not None:
+                max_depth = time_limit.depth
+            self.max_nodes = time_limit.nodes
+
+        self.nodes = 0
+        self.seldepth = 0
+        self.nodes_per_depth = []
+        self.depth_results = []
+        self.transposition_table.new_search()
+        self.age_move_ordering(board)
+        best_pv: list[chess.Move] = []
+        best_score = 0
+
+        for depth in range(1, max(1, max_depth) + 1):
+            self.search_depth = depth
+            self.pv_table = []
+            search_board = board.copy()
+            self.evaluator.reset(search_board)
+            try:
+                score = self.aspiration_search(search_board, depth, best_score)
+            except SearchTimeout:
+                break
 
-        next_child = None
+            best_score = score
+            best_pv = self.extend_pv(board, self.pv_table[0], depth)
+            self.nodes_per_depth.append(self.nodes - sum(self.nodes_per_depth))
+            self.depth_results.append((score, best_pv))
 
-        for child in root.children:
-            if child.get_score() == root.get_score():
-                next_child = child
+            if is_mate_score(score) or (self.soft_deadline is not None and time.time() >= self.soft_deadline):
                 break
 
-        if (root.get_score() == WHITE_WIN_SCORE or root.get_score() == BLACK_WIN_SCORE) and len(next_child.children) > 0:
-            for child in next_child.children:
-                if child.get_score() == root.get_score():
-                    self.cache = child
-                    break
-        else:
-            self.cache = None
-
-        return next_child.game.peek()
+        self.pv_table = [best_pv]
+        self.previous_pv = best_pv
+        return best_score
+
+    def aspiration_search(self, board: chess.Board, depth: int, previous_score: int) -> int:
+        """Search the root in a window around the score of the previous iteration."""
+        # A narrow window cuts off more of the tree than the full window. If the score falls outside, the side it failed
+        # on is widened and the root is searched again.
+        alpha, beta = BLACK_WIN_SCORE - 1, WHITE_WIN_SCORE + 1
+        window = ASPIRATION_WINDOW
+        if self.aspiration_windows and depth >= ASPIRATION_MIN_DEPTH and not is_mate_score(previous_score):
+            alpha, beta = previous_score - window, previous_score + window
+
+        while True:
+            score = self.alpha_beta_pruning(board, 0, depth, alpha, beta, True)
+            window *= ASPIRATION_GROWTH
+            if score <= alpha and alpha > BLACK_WIN_SCORE - 1:
+                alpha = max(BLACK_WIN_SCORE - 1, score - window)
+            elif score >= beta and beta < WHITE_WIN_SCORE + 1:
+                beta = min(WHITE_WIN_SCORE + 1, score + window)
+            else:
+                return score
+
+    def get_executor(self) -> Optional[concurrent.futures.ProcessPoolExecutor]:
+        """Get the pool of worker processes of `parallel_search`, starting it if needed."""
+        if self.executor is None:
+            if multiprocessing.current_process().daemon:
+                # Games played by lichess-bot run in pool processes, which are not allowed to start their own.
+                logger.warning("ChessAi cannot start worker processes from a daemonic process. Searching on one core. "
+                               'Set `game_runner: "thread"` in config.yml to search with more than one worker.')
+                self.threads = 1
+                return None
+            self.executor = concurrent.futures.ProcessPoolExecutor(self.threads)
+        return self.executor
+
+    def parallel_search(self, board: chess.Board, time_limit: Optional[chess.engine.Limit] = None) -> Optional[int]:
+        """Search the root moves in worker processes."""
+        # Root splitting: the root moves are dealt out to the worker processes, each of which runs its own iterative
+        # deepening (with its own transposition table) over its share. The best move is taken from the deepest
+        # iteration every worker finished. Returns the score, or None if the search has to fall back to a single core.
+        self.age_move_ordering(board)
+        entry = self.transposition_table.probe(chess.polyglot.zobrist_hash(board))
+        moves = self.order_moves(board, 0, entry.move if entry is not None else None, False)
+        executor = self.get_executor()
+        if executor is None or len(moves) < 2:
+            return None
+
+        workers = min(self.threads, len(moves))
+        deadlines = self.deadlines(board, time_limit)
+        depth = None
+        nodes = None
+        if time_limit is not None:
+            depth = time_limit.depth
+            nodes = None if time_limit.nodes is None else max(1, time_limit.nodes // workers)
+        worker_limit = chess.engine.Limit(depth=depth, nodes=nodes)
+
+        # Moves are dealt round-robin in their ordered sequence so every worker gets a share of the likely best moves.
+        options = {name: getattr(self, name) for name in SEARCH_OPTIONS}
+        futures = [executor.submit(search_root_moves, board, moves[index::workers], worker_limit, deadlines,
+                                   self.max_depth, self.transposition_table.size_mb, options)
+                   for index in range(workers)]
+        try:
+            results = [future.result() for future in futures]
+        except concurrent.futures.process.BrokenProcessPool:
+            logger.exception("ChessAi worker process failed. Searching on one core.")
+            self.close()
+            self.threads = 1
+            return None
+
+        # A worker that found a mate stopped early, but its score will not change with more depth.
+        unfinished_depths = [len(depth_results) for depth_results, *_ in results if not is_mate_score(depth_results[-1][0])]
+        completed_depth = min(unfinished_depths or [len(depth_results) for depth_results, *_ in results])
+        pick_best = max if board.turn == chess.WHITE else min
+        score, best_pv = pick_best((depth_results[min(completed_depth, len(depth_results)) - 1]
+                                    for depth_results, *_ in results),
+                                   key=lambda result: result[0])
+        self.pv_table = [best_pv]
+        self.previous_pv = best_pv
+        self.nodes_per_depth = [sum(nodes_per_depth[depth] if depth < len(nodes_per_depth) else 0
+                                    for _, nodes_per_depth, *_ in results)
+                                for depth in range(completed_depth)]
+        self.nodes = sum(nodes for _, _, nodes, _ in results)
+        self.seldepth = max(seldepth for *_, seldepth in results)
+        return score
+
+    def close(self) -> None:
+        """Shut the worker processes down."""
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+
+# The ChessAi of a worker process started by ChessAi.parallel_search. It is kept between searches so its transposition
+# table stays warm.
+worker_chess_ai: Optional[ChessAi] = None
+
+
+def search_root_moves(board: chess.Board, root_moves: list[chess.Move], time_limit: chess.engine.Limit,
+                      deadlines: Deadlines, max_depth: int, hash_size_mb: float,
+                      options: Optional[dict[str, bool]] = None) -> tuple[DepthResults, list[int], int, int]:
+    """Search some of the root moves in a worker process of `ChessAi.parallel_search`."""
+    global worker_chess_ai
+    if worker_chess_ai is None:
+        worker_chess_ai = ChessAi(max_depth, hash_size_mb)
+    elif worker_chess_ai.transposition_table.size_mb != hash_size_mb:
+        worker_chess_ai.transposition_table.resize(hash_size_mb)
+    worker_chess_ai.max_depth = max_depth
+    for name, value in (options or {}).items():
+        setattr(worker_chess_ai, name, value)
+    worker_chess_ai.root_moves = root_moves
+    worker_chess_ai.iterative_deepening(board, time_limit, deadlines)
+    return (worker_chess_ai.depth_results, worker_chess_ai.nodes_per_depth, worker_chess_ai.nodes,
+            worker_chess_ai.seldepth)
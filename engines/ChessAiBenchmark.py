@@ -0,0 +1,184 @@
+"""
+Micro-benchmarks for ChessAi.
+
+Run with `python -m engines.ChessAiBenchmark` from the lichess-bot directory.
+"""
+import random
+import time
+import timeit
+from typing import Any, Callable
+
+import chess
+import chess.engine
+
+from engines import BitboardEvaluation, ChessAi, IncrementalEvaluator
+
+# Openings, middlegames and endgames.
+REFERENCE_FENS = [
+    chess.STARTING_FEN,
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 1 5",
+    "r2q1rk1/pp2bppp/2n1pn2/3p4/3P4/2NBPN2/PP3PPP/R2Q1RK1 w - - 0 10",
+    "r4rk1/1pq2ppp/p1n1pn2/3p4/3P4/P1NBPN2/1P3PPP/R2Q1RK1 w - - 0 14",
+    "2r2rk1/1p3ppp/p3pn2/3p4/3P4/P3PN2/1P3PPP/2R2RK1 w - - 0 20",
+    "8/5pk1/6p1/3R4/8/6P1/5PKP/3r4 w - - 0 40",
+    "8/8/4k3/3p4/3P4/4K3/8/8 w - - 0 50",
+    "8/8/8/8/4k3/8/3QK3/8 w - - 0 60",
+]
+
+
+def benchmark(statement: Callable[[], Any], number: int) -> float:
+    """
+    Time a statement.
+
+    :param statement: The code to time.
+    :param number: How many times to run it.
+    :return: The average time of one run, in microseconds.
+    """
+    seconds = timeit.timeit(statement, number=number)
+    return seconds / number * 1_000_000
+
+
+def benchmark_move_ordering(number: int = 200) -> None:
+    """Time ChessAi.order_moves on the reference positions."""
+    chess_ai = ChessAi.ChessAi()
+    chess_ai.clear_move_ordering()
+    total = 0.0
+    for fen in REFERENCE_FENS:
+        board = chess.Board(fen)
+        time_per_call = benchmark(lambda: chess_ai.order_moves(board, 0, None, False), number)
+        total += time_per_call
+        print(f"order_moves {time_per_call:8.1f} us  {board.legal_moves.count():3d} moves  {fen}")
+    print(f"order_moves total {total:.1f} us for {len(REFERENCE_FENS)} positions")
+
+
+def benchmark_evaluation(positions_per_fen: int = 200) -> None:
+    """
+    Measure the positions per second of the evaluation functions.
+
+    The material and piece-square evaluate, the full evaluate_position, and evaluate_batch (with NumPy) score the same
+    positions, reached by random moves from the reference positions.
+    """
+    random.seed(0)
+    boards: list[chess.Board] = []
+    for fen in REFERENCE_FENS:
+        for _ in range(positions_per_fen):
+            board = chess.Board(fen)
+            for _ in range(random.randint(0, 12)):
+                moves = list(board.legal_moves)
+                if not moves:
+                    break
+                board.push(random.choice(moves))
+            boards.append(board)
+
+    timings: dict[str, Callable[[], Any]] = {
+        "evaluate": lambda: [IncrementalEvaluator.evaluate(board) for board in boards],
+        "evaluate_position": lambda: [BitboardEvaluation.evaluate_position(board) for board in boards],
+    }
+    if BitboardEvaluation.SQUARE_SCORE_ARRAY is not None:
+        # The time of evaluate_batch includes turning the bitboards into an array.
+        bitboards = [BitboardEvaluation.board_bitboards(board) for board in boards]
+        timings["evaluate_batch"] = lambda: BitboardEvaluation.evaluate_batch(bitboards)
+    for name, statement in timings.items():
+        seconds = benchmark(statement, 3) / 1_000_000
+        print(f"{name:18} {len(boards) / seconds:10.0f} positions/s")
+
+
+def benchmark_search(depth: int = 4) -> None:
+    """Count the nodes searched to complete each depth. Fewer nodes means better move ordering and pruning."""
+    total_nodes = [0] * depth
+    start_time = time.perf_counter()
+    for fen in REFERENCE_FENS:
+        chess_ai = ChessAi.ChessAi()
+        chess_ai.get_move(chess.Board(fen), chess.engine.Limit(depth=depth))
+        for index, nodes in enumerate(chess_ai.nodes_per_depth):
+            total_nodes[index] += nodes
+        print(f"nodes per depth {chess_ai.nodes_per_depth}  {fen}")
+    elapsed = time.perf_counter() - start_time
+    print(f"total nodes per depth {total_nodes}, {sum(total_nodes)} nodes in {elapsed:.2f} s "
+          f"({sum(total_nodes) / elapsed:.0f} nodes/s)")
+
+
+def benchmark_game(plies: int = 16, depth: int = 4) -> None:
+    """
+    Compare keeping the search state between the moves of a game with starting each move from scratch.
+
+    Both searches reach the same depth on the same positions. The nodes and time they take are printed.
+    """
+    chess_ai = ChessAi.ChessAi()
+    board = chess.Board()
+    kept_nodes = []
+    kept_time = 0.0
+    positions = []
+    for _ in range(plies):
+        positions.append(board.copy())
+        start_time = time.perf_counter()
+        move = chess_ai.get_move(board, chess.engine.Limit(depth=depth), "benchmark")
+        kept_time += time.perf_counter() - start_time
+        kept_nodes.append(chess_ai.nodes)
+        board.push(move)
+
+    fresh_nodes = []
+    fresh_time = 0.0
+    for position in positions:
+        chess_ai.new_game()
+        start_time = time.perf_counter()
+        chess_ai.get_move(position, chess.engine.Limit(depth=depth))
+        fresh_time += time.perf_counter() - start_time
+        fresh_nodes.append(chess_ai.nodes)
+
+    print(f"{plies} plies to depth {depth}: kept state {sum(kept_nodes)} nodes in {kept_time:.2f} s, "
+          f"fresh state {sum(fresh_nodes)} nodes in {fresh_time:.2f} s")
+    print(f"  nodes per move kept: {kept_nodes}")
+    print(f"  nodes per move fresh: {fresh_nodes}")
+
+
+def benchmark_selectivity(seconds: float = 2.0) -> None:
+    """Print the depth reached in the same time with the selective search features off, each one on, and all on."""
+    features = ["null_move_pruning", "late_move_reductions", "principal_variation_search", "aspiration_windows"]
+    settings: dict[str, list[str]] = {"none": []}
+    settings.update((feature, [feature]) for feature in features)
+    settings["all"] = features
+    for name, enabled in settings.items():
+        depths = []
+        for fen in REFERENCE_FENS:
+            chess_ai = ChessAi.ChessAi()
+            for feature in features:
+                setattr(chess_ai, feature, feature in enabled)
+            chess_ai.get_move(chess.Board(fen), chess.engine.Limit(time=seconds))
+            depths.append(len(chess_ai.nodes_per_depth))
+        print(f"{name:27} depths {depths}  total {sum(depths)}")
+
+
+def benchmark_parallel(worker_counts: tuple[int, ...] = (1, 2, 4, 8), seconds: float = 2.0) -> None:
+    """
+    Print the nodes per second of the root-split search for each number of worker processes.
+
+    The first search of each count starts the processes, so it is not timed.
+    """
+    fens = REFERENCE_FENS[2:6]
+    base_nps = None
+    for workers in worker_counts:
+        chess_ai = ChessAi.ChessAi(threads=workers)
+        chess_ai.get_move(chess.Board(fens[0]), chess.engine.Limit(depth=1))
+        nodes = 0
+        depths = []
+        start_time = time.perf_counter()
+        for fen in fens:
+            chess_ai.get_move(chess.Board(fen), chess.engine.Limit(time=seconds))
+            nodes += chess_ai.nodes
+            depths.append(len(chess_ai.nodes_per_depth))
+        elapsed = time.perf_counter() - start_time
+        chess_ai.close()
+        nps = nodes / elapsed
+        base_nps = base_nps or nps
+        print(f"{workers} workers: {nps:9.0f} nodes/s  scaling {nps / base_nps:.2f}x  depths {depths}")
+
+
+if __name__ == "__main__":
+    benchmark_move_ordering()
+    benchmark_evaluation()
+    benchmark_search()
+    benchmark_game()
+    benchmark_selectivity()
+    benchmark_parallel()
@@ -1,47 +1,83 @@
-import time
-
+"""A homemade engine that plays with ChessAi."""
 import chess
+import threading
+
+from typing import Optional
 
 from lib import model
+from lib.config import Configuration
 from lib.conversation import Conversation
-from lib.engine_wrapper import MinimalEngine, MOVE
+from lib.engine_wrapper import MinimalEngine, MOVE, OPTIONS_TYPE, COMMANDS_TYPE
 from chess.engine import PlayResult
 
 from engines.ChessAi import ChessAi
+from engines.OpeningCache import OpeningCache
+
+# homemade_options that switch the selective search features of ChessAi on and off.
+SEARCH_FEATURE_OPTIONS = {
+    "Null Move Pruning": "null_move_pruning",
+    "Late Move Reductions": "late_move_reductions",
+    "Principal Variation Search": "principal_variation_search",
+    "Aspiration Windows": "aspiration_windows",
+}
 
 
 class HomemadeChessAiWrapper(MinimalEngine):
-    time_spent = 0
-    chess_ai = ChessAi(3)
+    """
+    Play with ChessAi.
 
-    def search(self, board: chess.Board, time_limit: chess.engine.Limit, ponder: bool, draw_offered: bool,
-               root_moves: MOVE, conversation: Conversation, game: model.Game) -> PlayResult:
-        start_time = time.time()
+    lichess-bot keeps the engine running between games, so one instance plays one game after another. Its ChessAi is
+    reset when a game starts, except for the opening cache.
+    """
+
+    # Searched opening positions, shared by the games this process plays when the "Shared Cache" or "Opening Cache"
+    # option is on, by file name (None for the in-memory cache).
+    opening_caches: dict[Optional[str], OpeningCache] = {}
 
-        increment = game.clock_increment.total_seconds()
+    def __init__(self, commands: COMMANDS_TYPE, options: OPTIONS_TYPE, stderr: Optional[int],
+                 draw_or_resign: Configuration, game: Optional[model.Game] = None, **popen_args: str) -> None:
+        """Create the ChessAi with the `homemade_options` (see config.yml.default)."""
+        super().__init__(commands, options, stderr, draw_or_resign, game, **popen_args)
+        search_features = {attribute: bool(options[option])
+                           for option, attribute in SEARCH_FEATURE_OPTIONS.items() if option in options}
+        self.chess_ai = ChessAi(3,
+                                hash_size_mb=options.get("Hash") or 16,
+                                threads=options.get("Threads") or 1,
+                                opening_cache=self.get_opening_cache(options),
+                                **search_features)
 
-        time_left = game.clock_initial.total_seconds() - self.time_spent
+    @classmethod
+    def get_opening_cache(cls, options: OPTIONS_TYPE) -> Optional[OpeningCache]:
+        """Get the opening cache the options ask for, opening it the first time, or None if they ask for none."""
+        path = options.get("Opening Cache")
+        if not path and not options.get("Shared Cache"):
+            return None
+        if path not in cls.opening_caches:
+            cls.opening_caches[path] = OpeningCache(path)
+        opening_cache = cls.opening_caches[path]
+        opening_cache.min_count = options.get("Opening Cache Min Count") or 1
+        return opening_cache
 
-        if time_left < 30:
-            if self.chess_ai.max_depth != 1:
-                conversation.send_message("player", "I have less than 30 seconds, so I will only search one move ahead.")
-                conversation.send_message("spectator", "I have less than 30 seconds, so I will only search one move ahead.")
-                self.chess_ai.max_depth = 1
-        elif time_left <= 120:
-            if self.chess_ai.max_depth != 2:
-                conversation.send_message("player", "I have less than two minutes, so I will only search two moves ahead.")
-                conversation.send_message("spectator", "I have less than two minutes, so I will only search two moves ahead.")
-                self.chess_ai.max_depth = 2
-        else:
-            if self.chess_ai.max_depth != 3:
-                conversation.send_message("player", "I have enough time. I will search three moves ahead.")
-                conversation.send_message("spectator", "I have enough time. I will search three moves ahead.")
-                self.chess_ai.max_depth = 3
+    def search(self, board: chess.Board, time_limit: chess.engine.Limit, ponder: bool, draw_offered: bool,
+               root_moves: MOVE, conversation: Conversation, game: model.Game) -> PlayResult:
+        """Choose a move with ChessAi."""
+        time_limit = self.add_go_commands(time_limit)
+        next_move = self.chess_ai.get_move(board, time_limit, game.id)
 
-        next_move = self.chess_ai.get_move(board)
+        result = PlayResult(next_move, self.chess_ai.ponder_move, self.chess_ai.info)
+        self.scores.append(result.info["score"])
+        return self.offer_draw_or_resign(result, board)
 
-        end_time = time.time()
+    def new_game(self, game: model.Game) -> None:
+        """Forget the search state of the last game."""
+        super().new_game(game)
+        self.chess_ai.new_game(game.id)
 
-        self.time_spent += end_time - start_time - increment
+    def ponder(self, board: chess.Board, stop: threading.Event) -> None:
+        """Search the position after the expected reply until `stop` is set."""
+        self.chess_ai.ponder(board, stop)
 
-        return PlayResult(next_move, None)
+    def quit(self) -> None:
+        """Stop the search workers of ChessAi."""
+        super().quit()
+        self.chess_ai.close()
@@ -0,0 +1,180 @@
+"""A material and piece-square evaluation that can be updated move by move."""
+from typing import Optional
+
+import chess
+
+PIECE_VALUES = {
+    chess.PAWN: 100,
+    chess.KNIGHT: 300,
+    chess.BISHOP: 300,
+    chess.ROOK: 500,
+    chess.QUEEN: 800,
+    chess.KING: 0
+}
+
+# Piece-square tables from white's point of view, written with the eighth rank first as they appear on a board.
+PIECE_SQUARE_TABLES = {
+    chess.PAWN: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0,
+    ],
+    chess.KNIGHT: [
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50,
+    ],
+    chess.BISHOP: [
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20,
+    ],
+    chess.ROOK: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        0, 0, 0, 5, 5, 0, 0, 0,
+    ],
+    chess.QUEEN: [
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20,
+    ],
+    chess.KING: [
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        20, 20, 0, 0, 0, 0, 20, 20,
+        20, 30, 10, 0, 0, 10, 30, 20,
+    ],
+}
+
+
+def build_square_scores() -> list[list[list[int]]]:
+    """
+    Combine the piece values and piece-square tables into one table.
+
+    SQUARE_SCORES[color][piece_type][square] is the material plus piece-square value of a piece, positive for white and
+    negative for black, so a position's score is the sum over its pieces.
+    """
+    square_scores: list[list[list[int]]] = [[[0] * 64 for _ in range(chess.KING + 1)] for _ in chess.COLORS]
+    for piece_type, table in PIECE_SQUARE_TABLES.items():
+        for square in chess.SQUARES:
+            white_value = PIECE_VALUES[piece_type] + table[chess.square_mirror(square)]
+            black_value = PIECE_VALUES[piece_type] + table[square]
+            square_scores[chess.WHITE][piece_type][square] = white_value
+            square_scores[chess.BLACK][piece_type][square] = -black_value
+    return square_scores
+
+
+SQUARE_SCORES = build_square_scores()
+
+
+def evaluate(board: chess.Board) -> int:
+    """Material and piece-square score of a position from white's point of view."""
+    score = 0
+    for color in chess.COLORS:
+        color_scores = SQUARE_SCORES[color]
+        for piece_type in chess.PIECE_TYPES:
+            piece_scores = color_scores[piece_type]
+            for square in chess.scan_forward(board.pieces_mask(piece_type, color)):
+                score += piece_scores[square]
+    return score
+
+
+class IncrementalEvaluator:
+    """
+    Keep the material and piece-square score of a board up to date as moves are pushed and popped.
+
+    Push and pop moves through the evaluator instead of the board, so each update only looks at the squares the move
+    touches. The score is from white's point of view.
+    """
+
+    def __init__(self, board: Optional[chess.Board] = None) -> None:
+        """:param board: The board to score. If it is not given, call `reset` before pushing moves."""
+        self.score = 0
+        self.history: list[int] = []
+        if board is not None:
+            self.reset(board)
+
+    def reset(self, board: chess.Board) -> None:
+        """Score `board` from scratch and forget the moves pushed so far."""
+        self.score = evaluate(board)
+        self.history = []
+
+    def move_delta(self, board: chess.Board, move: chess.Move) -> int:
+        """Score change from playing `move`, which must be legal on `board`."""
+        if not move:
+            return 0
+
+        color = board.turn
+        own_scores = SQUARE_SCORES[color]
+        piece_type = board.piece_type_at(move.from_square) or chess.PAWN
+
+        if board.is_castling(move):
+            rank = chess.square_rank(move.from_square)
+            kingside = board.is_kingside_castling(move)
+            king_to = chess.square(6 if kingside else 2, rank)
+            rook_to = chess.square(5 if kingside else 3, rank)
+            if board.rooks & board.occupied_co[color] & chess.BB_SQUARES[move.to_square]:
+                rook_from = move.to_square
+            else:
+                rook_from = chess.square(7 if kingside else 0, rank)
+            king_scores = own_scores[chess.KING]
+            rook_scores = own_scores[chess.ROOK]
+            return (king_scores[king_to] - king_scores[move.from_square]
+                    + rook_scores[rook_to] - rook_scores[rook_from])
+
+        delta = own_scores[move.promotion or piece_type][move.to_square] - own_scores[piece_type][move.from_square]
+
+        if board.is_en_passant(move):
+            captured_square = move.to_square - 8 if color == chess.WHITE else move.to_square + 8
+            delta -= SQUARE_SCORES[not color][chess.PAWN][captured_square]
+        else:
+            captured_type = board.piece_type_at(move.to_square)
+            if captured_type:
+                delta -= SQUARE_SCORES[not color][captured_type][move.to_square]
+
+        return delta
+
+    def push(self, board: chess.Board, move: chess.Move) -> None:
+        """Play `move` on `board` and update the score."""
+        self.history.append(self.score)
+        self.score += self.move_delta(board, move)
+        board.push(move)
+
+    def pop(self, board: chess.Board) -> chess.Move:
+        """
+        Take back the last move pushed on `board` and restore the score before it.
+
+        :return: The move taken back.
+        """
+        self.score = self.history.pop()
+        return board.pop()
@@ -0,0 +1,184 @@
+"""A cache of search results for opening positions, which can be kept in a file and shared between processes."""
+import mmap
+import os
+import struct
+from typing import NamedTuple, Optional
+
+import chess
+import chess.polyglot
+
+from engines.ChessAi import decode_move, encode_move
+
+# File layout: a header (magic, version, slot count) and then the slots. A slot is two little-endian 64-bit words: the
+# Zobrist key XORed with the data word, and the data word (see pack_data). A slot that another process was writing while
+# it was read does not match its key, so it is treated as empty instead of being read half-written.
+MAGIC = b"CAOC"
+VERSION = 1
+HEADER = struct.Struct("<4sII")
+SLOT = struct.Struct("<QQ")
+# Slots probed for a key, starting at key % slots.
+BUCKET_SIZE = 4
+MAX_COUNT = 255
+MAX_DEPTH = 255
+MAX_SCORE = 32767
+
+
+class OpeningCacheEntry(NamedTuple):
+    """The result of searching a position, and how many times it has been searched."""
+
+    move: Optional[chess.Move]
+    ponder: Optional[chess.Move]
+    score: int
+    depth: int
+    searches: int
+
+
+def pack_data(entry: OpeningCacheEntry) -> int:
+    """
+    Pack an entry into the data word of a slot.
+
+    The fields are the move (16 bits), ponder move (16), score (16, signed), depth (8) and times searched (8). The score,
+    depth and times searched are clamped to fit.
+    """
+    move = encode_move(entry.move) if entry.move is not None else 0
+    ponder = encode_move(entry.ponder) if entry.ponder is not None else 0
+    score = max(-MAX_SCORE, min(MAX_SCORE, entry.score)) & 0xFFFF
+    return move | ponder << 16 | score << 32 | min(entry.depth, MAX_DEPTH) << 48 | min(entry.searches, MAX_COUNT) << 56
+
+
+def unpack_data(data: int) -> OpeningCacheEntry:
+    """Unpack the data word of a slot (see pack_data)."""
+    move = data & 0xFFFF
+    ponder = data >> 16 & 0xFFFF
+    score = data >> 32 & 0xFFFF
+    return OpeningCacheEntry(decode_move(move) if move else None,
+                             decode_move(ponder) if ponder else None,
+                             score - 0x10000 if score > MAX_SCORE else score,
+                             data >> 48 & 0xFF,
+                             data >> 56 & 0xFF)
+
+
+def replacement_order(data: int) -> tuple[int, int]:
+    """
+    Get the sort key of a slot when choosing which slot of a bucket to replace.
+
+    Empty slots are replaced first, then the positions searched the fewest times, then the shallowest results.
+    """
+    if not data:
+        return -1, -1
+    entry = unpack_data(data)
+    return entry.searches, entry.depth
+
+
+class OpeningCache:
+    """
+    Search results for positions near the start of the game, indexed by Zobrist key.
+
+    The table lives in a memory-mapped file when `path` is given, so the results outlive the process and are shared by
+    every process that opens the same file; without a path it is kept in memory and shared by the ChessAi instances of
+    one process. A result is only used once the position has been searched `min_count` times, so one-off positions do not
+    take the place of the openings that keep coming back. A position is only written again when it is searched deeper, so
+    the cache is read far more often than it is written.
+    """
+
+    def __init__(self, path: Optional[str] = None, size_mb: float = 4, max_plies: int = 20, min_depth: int = 5,
+                 min_count: int = 1) -> None:
+        """
+        Create the cache, or open the one in `path`.
+
+        :param path: The file to keep the cache in. None keeps it in memory.
+        :param size_mb: The size of a new cache, in MB. An existing file keeps its own size.
+        :param max_plies: Positions after this many plies are not cached.
+        :param min_depth: The shallowest result to keep, and the depth a result needs to be used in a timed search.
+        :param min_count: How many times a position has to be searched before its result is used.
+        """
+        self.path = path
+        self.max_plies = max_plies
+        self.min_depth = min_depth
+        self.min_count = min_count
+        self.slots = max(BUCKET_SIZE, int(size_mb * 1024 * 1024) // SLOT.size)
+        if path is None:
+            self.map = mmap.mmap(-1, HEADER.size + self.slots * SLOT.size)
+            HEADER.pack_into(self.map, 0, MAGIC, VERSION, self.slots)
+        else:
+            self.map = self.open_file(path)
+
+    def open_file(self, path: str) -> mmap.mmap:
+        """Map the cache file into memory, creating it first if it does not exist."""
+        # Appending creates the file if needed without truncating one that another process is using.
+        open(path, "ab").close()
+        with open(path, "r+b") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                file.write(HEADER.pack(MAGIC, VERSION, self.slots))
+                file.truncate(HEADER.size + self.slots * SLOT.size)
+                file.flush()
+            file.seek(0)
+            header = file.read(HEADER.size)
+            if len(header) < HEADER.size or HEADER.unpack(header)[:2] != (MAGIC, VERSION):
+                raise ValueError(f"{path} is not a ChessAi opening cache.")
+            # An existing file keeps its own size.
+            self.slots = HEADER.unpack(header)[2]
+            return mmap.mmap(file.fileno(), HEADER.size + self.slots * SLOT.size)
+
+    def slot_offsets(self, key: int) -> list[int]:
+        """Get the file offsets of the slots a position may be stored in."""
+        first = key % self.slots
+        return [HEADER.size + (first + i) % self.slots * SLOT.size for i in range(BUCKET_SIZE)]
+
+    def read(self, key: int) -> Optional[OpeningCacheEntry]:
+        """Get the entry of the position with this Zobrist key, or None if it is not stored."""
+        for offset in self.slot_offsets(key):
+            checked_key, data = SLOT.unpack_from(self.map, offset)
+            if data and checked_key ^ data == key:
+                return unpack_data(data)
+        return None
+
+    def write(self, key: int, entry: OpeningCacheEntry) -> None:
+        """Store the entry of the position with this Zobrist key, replacing the least useful slot of its bucket."""
+        offsets = self.slot_offsets(key)
+        slots = [SLOT.unpack_from(self.map, offset) for offset in offsets]
+        same_position = [offset for offset, (checked_key, data) in zip(offsets, slots) if data and checked_key ^ data == key]
+        if same_position:
+            offset = same_position[0]
+        else:
+            offset = min(zip(offsets, slots), key=lambda slot: replacement_order(slot[1][1]))[0]
+        data = pack_data(entry)
+        SLOT.pack_into(self.map, offset, key ^ data, data)
+
+    def probe(self, board: chess.Board, depth: Optional[int] = None) -> Optional[OpeningCacheEntry]:
+        """Get the result for the position, if it has been searched often enough and to at least `depth` (or min_depth)."""
+        if board.ply() >= self.max_plies:
+            return None
+        entry = self.read(chess.polyglot.zobrist_hash(board))
+        if (entry is None or entry.move is None or entry.searches < self.min_count
+                or entry.depth < max(depth or 0, self.min_depth) or not board.is_legal(entry.move)):
+            return None
+        return entry
+
+    def store(self, board: chess.Board, pv: list[chess.Move], score: int, depth: int) -> None:
+        """Count a search of the position, and keep its result if it went deeper than the one already stored."""
+        if board.ply() >= self.max_plies or not pv:
+            return
+        key = chess.polyglot.zobrist_hash(board)
+        old = self.read(key)
+        searches = min(MAX_COUNT, (old.searches if old is not None else 0) + 1)
+        if depth >= self.min_depth and (old is None or old.move is None or depth > old.depth):
+            entry = OpeningCacheEntry(pv[0], pv[1] if len(pv) > 1 else None, score, depth, searches)
+        elif old is not None:
+            entry = old._replace(searches=searches)
+        else:
+            entry = OpeningCacheEntry(None, None, 0, 0, searches)
+        self.write(key, entry)
+
+    def __len__(self) -> int:
+        """Count the stored positions."""
+        return sum(1 for offset in range(HEADER.size, len(self.map), SLOT.size) if SLOT.unpack_from(self.map, offset)[1])
+
+    def clear(self) -> None:
+        """Remove every stored position."""
+        self.map[HEADER.size:] = bytes(len(self.map) - HEADER.size)
+
+    def close(self) -> None:
+        """Write the cache to its file and unmap it."""
+        self.map.flush()
+        self.map.close()
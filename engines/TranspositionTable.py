@@ -0,0 +1,98 @@
+"""A transposition table that stores search results by the Zobrist key of the position."""
+from typing import NamedTuple, Optional
+
+import chess
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Rough size of one stored entry (tuple, Zobrist key, ints and move) in bytes. Used to turn a size in MB into a slot count.
+ENTRY_SIZE = 200
+
+
+class TTEntry(NamedTuple):
+    """
+    The result of searching a position.
+
+    `flag` says whether `score` is exact (`EXACT`) or a bound (`LOWER_BOUND` or `UPPER_BOUND`), and `generation` is the
+    search that stored it (see `TranspositionTable.new_search`).
+    """
+
+    key: int
+    depth: int
+    flag: int
+    score: int
+    move: Optional[chess.Move]
+    generation: int
+
+
+class TranspositionTable:
+    """A fixed-size hash table of search results, indexed by Zobrist key."""
+
+    def __init__(self, size_mb: float = 16) -> None:
+        """:param size_mb: About how much memory the table may use, in MB."""
+        self.size_mb = size_mb
+        self.size = 1
+        self.table: list[Optional[TTEntry]] = [None]
+        self.generation = 0
+        self.resize(size_mb)
+
+    def resize(self, size_mb: float) -> None:
+        """
+        Change the size of the table. The stored results are lost.
+
+        :param size_mb: About how much memory the table may use, in MB.
+        """
+        self.size_mb = size_mb
+        self.size = max(1, int(size_mb * 1024 * 1024) // ENTRY_SIZE)
+        self.clear()
+
+    def clear(self) -> None:
+        """Remove all stored results."""
+        self.table = [None] * self.size
+        self.generation = 0
+
+    def new_search(self) -> None:
+        """Age the table so entries from earlier searches are replaced first."""
+        self.generation += 1
+
+    def probe(self, key: int) -> Optional[TTEntry]:
+        """
+        Look up the stored result of a position.
+
+        :param key: The Zobrist key of the position.
+        :return: The stored result, or `None` if the position is not in the table.
+        """
+        entry = self.table[key % self.size]
+        if entry is not None and entry.key == key:
+            return entry
+        return None
+
+    def store(self, key: int, depth: int, flag: int, score: int, move: Optional[chess.Move]) -> None:
+        """
+        Store the result of a search.
+
+        A slot holding a deeper result from the current search is kept, unless it is for the same position. A result
+        without a move keeps the move already stored for the position.
+
+        :param key: The Zobrist key of the position.
+        :param depth: The depth the position was searched to.
+        :param flag: Whether the score is exact or a bound.
+        :param score: The score of the position.
+        :param move: The best move found, if any.
+        """
+        index = key % self.size
+        old = self.table[index]
+        if (old is None
+                or old.key == key
+                or old.generation != self.generation
+                or depth >= old.depth):
+            if old is not None and old.key == key and move is None:
+                move = old.move
+            self.table[index] = TTEntry(key, depth, flag, score, move, self.generation)
+
+    def hashfull(self) -> int:
+        """Permille of the first 1000 slots that are used, as reported by UCI engines."""
+        sample = self.table[:1000]
+        return sum(1 for entry in sample if entry is not None) * 1000 // len(sample)
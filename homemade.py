@@ -9,6 +9,7 @@ import chess
 from chess.engine import PlayResult, Limit
 import random
 from lib.engine_wrapper import MinimalEngine, MOVE
+from engines.IncrementalEvaluator import IncrementalEvaluator
 from typing import Any
 import logging
 
@@ -95,4 +96,19 @@ class ComboEngine(ExampleEngine):
         return PlayResult(move, None, draw_offered=draw_offered)
 
 
+class GreedyEvaluation(ExampleEngine):
+    """
+    Get the move that leads to the best material and piece-square score.
+
+    This engine demonstrates how `IncrementalEvaluator`, the evaluation used by `ChessAi`, can be shared by other engines.
+    """
+
+    def search(self, board: chess.Board, *args: Any) -> PlayResult:
+        """Choose the move that improves the score the most for the side to move."""
+        evaluator = IncrementalEvaluator(board)
+        sign = 1 if board.turn == chess.WHITE else -1
+        move = max(board.legal_moves, key=lambda move: sign * evaluator.move_delta(board, move))
+        return PlayResult(move, None)
+
+
 from engines.HomemadeChessAiWrapper import HomemadeChessAiWrapper
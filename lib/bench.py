@@ -0,0 +1,251 @@
+"""
+Benchmark a homemade engine on a fixed set of positions, without playing games on lichess.
+
+Run with `python -m lib.bench <engine name>` from the lichess-bot directory, e.g.
+`python -m lib.bench HomemadeChessAiWrapper --depth 4 --json bench.json`. The engine is created from the config the same
+way lichess-bot creates it, so its `homemade_options` are used.
+"""
+from __future__ import annotations
+import argparse
+import chess
+import chess.engine
+import datetime
+import json
+import logging
+import os
+import time
+import yaml
+from typing import Any, Optional, cast
+from lib import config, model
+from lib.conversation import Conversation
+from lib.engine_wrapper import EngineWrapper, LICHESS_TYPE, create_engine
+
+logger = logging.getLogger(__name__)
+
+BENCH_RESULT_TYPE = dict[str, Any]
+
+
+class BenchPosition:
+    """A position of the benchmark suite."""
+
+    def __init__(self, name: str, fen: str, best_moves: Optional[list[str]] = None) -> None:
+        """
+        Describe a benchmark position.
+
+        :param name: A short name to show in the report.
+        :param fen: The position.
+        :param best_moves: The moves (in UCI notation) that solve the position, if it has a clear solution.
+        """
+        self.name = name
+        self.fen = fen
+        self.best_moves = best_moves or []
+
+
+BENCH_POSITIONS = [
+    BenchPosition("start", chess.STARTING_FEN),
+    BenchPosition("open game", "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3"),
+    BenchPosition("italian", "r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 1 5"),
+    BenchPosition("queen's gambit", "r2q1rk1/pp2bppp/2n1pn2/3p4/3P4/2NBPN2/PP3PPP/R2Q1RK1 w - - 0 10"),
+    BenchPosition("middlegame", "r4rk1/1pq2ppp/p1n1pn2/3p4/3P4/P1NBPN2/1P3PPP/R2Q1RK1 w - - 0 14"),
+    BenchPosition("rook endgame", "8/5pk1/6p1/3R4/8/6P1/5PKP/3r4 w - - 0 40"),
+    BenchPosition("pawn endgame", "8/8/4k3/3p4/3P4/4K3/8/8 w - - 0 50"),
+    BenchPosition("back rank mate", "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1", ["d1d8"]),
+    BenchPosition("scholar's mate", "r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4", ["h5f7"]),
+    BenchPosition("rook ladder", "7k/8/8/8/8/8/R7/1R4K1 w - - 0 1", ["a2a7", "b1b7"]),
+    BenchPosition("hanging queen", "rnb1kbnr/pppp1ppp/8/4p3/4P2q/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3", ["f3h4"]),
+    BenchPosition("hanging queen black", "rnbqkb1r/pppp1ppp/5n2/4p2Q/4P3/8/PPPP1PPP/RNB1KBNR b KQkq - 3 3", ["f6h5"]),
+    BenchPosition("knight fork", "r3k3/8/8/1N6/8/8/8/4K3 w - - 0 1", ["b5c7"]),
+    BenchPosition("promotion", "8/4P1k1/8/8/8/8/8/4K3 w - - 0 1", ["e7e8q"]),
+]
+
+
+def bench_game(game_id: str, board: chess.Board) -> model.Game:
+    """Make a game for the engine to search in. Each search gets its own game id, so no engine state carries over."""
+    game_info = {"id": game_id,
+                 "variant": {"key": "standard", "name": "Standard", "short": "Std"},
+                 "speed": "classical",
+                 "perf": {"name": "Classical"},
+                 "rated": False,
+                 "createdAt": int(time.time() * 1000),
+                 "white": {"name": "bench"},
+                 "black": {"name": "bench"},
+                 "initialFen": board.fen(),
+                 "state": {"moves": "", "wtime": 0, "btime": 0, "winc": 0, "binc": 0, "status": "started"}}
+    return model.Game(game_info, "bench", "https://lichess.org/", datetime.timedelta(seconds=60))
+
+
+def search_position(engine: EngineWrapper, board: chess.Board, limit: chess.engine.Limit,
+                    game_id: str) -> tuple[chess.engine.PlayResult, float]:
+    """
+    Search a position once.
+
+    :return: The engine's move and how long it took, in seconds.
+    """
+    game = bench_game(game_id, board)
+    # The engine is not playing on lichess, so there is no chat for the conversation to send to.
+    conversation = Conversation(game, cast(LICHESS_TYPE, None), "bench")
+    # `add_go_commands` replaces the depth and node limits of a search with the go_commands of the config.
+    engine.go_commands = config.Configuration({"depth": limit.depth, "nodes": limit.nodes})
+    time_limit = chess.engine.Limit(time=limit.time, depth=limit.depth, nodes=limit.nodes)
+    start_time = time.perf_counter()
+    result = engine.search(board.copy(), time_limit, False, False, chess.engine.PlayResult(None, None), conversation,
+                           game)
+    return result, time.perf_counter() - start_time
+
+
+def bench_position(engine: EngineWrapper, position: BenchPosition, limit: chess.engine.Limit,
+                   index: int) -> BENCH_RESULT_TYPE:
+    """
+    Benchmark the engine on one position.
+
+    With a depth limit, the position is also searched to every smaller depth, each from a fresh game, to get the time
+    to reach each depth.
+    """
+    board = chess.Board(position.fen)
+    time_to_depth = []
+    if limit.depth is not None:
+        for depth in range(1, limit.depth):
+            _, elapsed = search_position(engine, board, chess.engine.Limit(depth=depth), f"bench{index}d{depth}")
+            time_to_depth.append(elapsed)
+
+    result, elapsed = search_position(engine, board, limit, f"bench{index}")
+    if limit.depth is not None:
+        time_to_depth.append(elapsed)
+
+    info = result.info
+    nodes = info.get("nodes")
+    score = info.get("score")
+    move = result.move.uci() if result.move is not None else None
+    return {"name": position.name,
+            "fen": position.fen,
+            "move": move,
+            "best_moves": position.best_moves,
+            "agrees": move in position.best_moves if position.best_moves else None,
+            "depth": info.get("depth"),
+            "seldepth": info.get("seldepth"),
+            "nodes": nodes,
+            "time": elapsed,
+            "nps": nodes / elapsed if nodes is not None and elapsed > 0 else None,
+            "score": str(score.white()) if score is not None else None,
+            "time_to_depth": time_to_depth}
+
+
+def run_bench(engine: EngineWrapper, limit: chess.engine.Limit,
+              positions: Optional[list[BenchPosition]] = None) -> BENCH_RESULT_TYPE:
+    """
+    Benchmark the engine on every position of the suite.
+
+    :param engine: The engine to benchmark.
+    :param limit: The limit of each search.
+    :param positions: The positions to search. Defaults to `BENCH_POSITIONS`.
+    :return: The results of each position and the totals, ready to be written as JSON.
+    """
+    results = [bench_position(engine, position, limit, index)
+               for index, position in enumerate(positions or BENCH_POSITIONS)]
+    nodes = [result["nodes"] for result in results if result["nodes"] is not None]
+    total_time = sum(result["time"] for result in results)
+    solved = [result["agrees"] for result in results if result["agrees"] is not None]
+    max_depth = max((len(result["time_to_depth"]) for result in results), default=0)
+    return {"engine": engine.name(),
+            "limit": {"depth": limit.depth, "time": limit.time, "nodes": limit.nodes},
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "positions": results,
+            "total": {"nodes": sum(nodes) if nodes else None,
+                      "time": total_time,
+                      "nps": sum(nodes) / total_time if nodes and total_time > 0 else None,
+                      "solved": sum(solved),
+                      "with_best_moves": len(solved),
+                      "time_to_depth": [sum(result["time_to_depth"][depth] for result in results
+                                            if depth < len(result["time_to_depth"]))
+                                        for depth in range(max_depth)]}}
+
+
+def compare_with_baseline(bench: BENCH_RESULT_TYPE, baseline: BENCH_RESULT_TYPE) -> list[str]:
+    """Describe how a benchmark differs from an earlier one: changed moves, and the speed and node count ratios."""
+    lines = []
+    baseline_moves = {position["fen"]: position["move"] for position in baseline["positions"]}
+    for position in bench["positions"]:
+        old_move = baseline_moves.get(position["fen"])
+        if old_move is not None and old_move != position["move"]:
+            lines.append(f"{position['name']}: {old_move} -> {position['move']}")
+    same = sum(baseline_moves.get(position["fen"]) == position["move"] for position in bench["positions"])
+    lines.append(f"Same move as the baseline in {same} of {len(bench['positions'])} positions")
+
+    for key in ("time", "nodes", "nps"):
+        new, old = bench["total"][key], baseline["total"].get(key)
+        if new is not None and old:
+            lines.append(f"Total {key}: {old:.6g} -> {new:.6g} ({new / old:.2f}x)")
+    return lines
+
+
+def format_bench(bench: BENCH_RESULT_TYPE) -> list[str]:
+    """Get the lines of a human-readable report of a benchmark."""
+    def optional(value: Any, format_spec: str) -> str:
+        return "-" if value is None else format(value, format_spec)
+
+    lines = [f"{'position':20} {'move':6} {'ok':3} {'depth':>5} {'nodes':>9} {'time':>8} {'nps':>8}  score"]
+    for result in bench["positions"]:
+        agrees = {True: "yes", False: "NO", None: ""}[result["agrees"]]
+        lines.append(f"{result['name']:20} {result['move'] or '-':6} {agrees:3} {optional(result['depth'], '>5')} "
+                     f"{optional(result['nodes'], '>9')} {result['time']:8.3f} {optional(result['nps'], '>8.0f')}  "
+                     f"{result['score'] or ''}")
+    total = bench["total"]
+    lines.append(f"Total: {optional(total['nodes'], '')} nodes in {total['time']:.3f} s, "
+                 f"{optional(total['nps'], '.0f')} nodes/s, solved {total['solved']} of {total['with_best_moves']}")
+    if total["time_to_depth"]:
+        depth_times = [f"{depth} {seconds:.3f} s" for depth, seconds in enumerate(total["time_to_depth"], 1)]
+        lines.append(f"Time to depth: {', '.join(depth_times)}")
+    return lines
+
+
+def load_engine_config(config_file: str, engine_name: Optional[str]) -> config.Configuration:
+    """
+    Read the config for the benchmark.
+
+    Unlike `config.load_config`, the config is not validated, so it does not need a token.
+    """
+    with open(config_file) as stream:
+        CONFIG = yaml.safe_load(stream)
+    if engine_name is not None:
+        CONFIG["engine"]["name"] = engine_name
+        CONFIG["engine"]["protocol"] = "homemade"
+    config.insert_default_values(CONFIG)
+    return config.Configuration(CONFIG)
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark a homemade engine on a fixed set of positions.")
+    parser.add_argument("engine", nargs="?", help="The name of the engine class in homemade.py. Defaults to the "
+                                                  "engine in the config.")
+    parser.add_argument("--config", help="The config to read the engine options from (defaults to ./config.yml, or "
+                                         "./config.yml.default if there is none).")
+    parser.add_argument("--depth", type=int, help="Search every position to this depth (defaults to 4 when there is no "
+                                                  "other limit). The time to each smaller depth is measured too.")
+    parser.add_argument("--time", type=float, help="Search every position for this many seconds.")
+    parser.add_argument("--nodes", type=int, help="Search every position for this many nodes.")
+    parser.add_argument("--json", help="Write the results to this file as JSON.")
+    parser.add_argument("--baseline", help="Compare the results with an earlier JSON file.")
+    parser.add_argument("-v", action="store_true", help="Show the engine's debug logging.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.v else logging.WARNING)
+    config_file = args.config or ("./config.yml" if os.path.isfile("./config.yml") else "./config.yml.default")
+    CONFIG = load_engine_config(config_file, args.engine)
+    depth = args.depth if args.depth is not None or args.time is not None or args.nodes is not None else 4
+    limit = chess.engine.Limit(depth=depth, time=args.time, nodes=args.nodes)
+
+    with create_engine(CONFIG) as engine:
+        bench = run_bench(engine, limit)
+
+    print("\n".join(format_bench(bench)))
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            print("\n".join(compare_with_baseline(bench, json.load(baseline_file))))
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(bench, json_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
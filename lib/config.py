@@ -154,6 +154,7 @@ def insert_default_values(CONFIG: CONFIG_DICT_TYPE) -> None:
     set_config_default(CONFIG, key="abort_time", default=20)
     set_config_default(CONFIG, key="move_overhead", default=1000)
     set_config_default(CONFIG, key="quit_after_all_games_finish", default=False)
+    set_config_default(CONFIG, key="game_runner", default="process")
     set_config_default(CONFIG, key="rate_limiting_delay", default=0)
     set_config_default(CONFIG, key="pgn_file_grouping", default="game", force_empty_values=True)
     set_config_default(CONFIG, "engine", key="working_dir", default=os.getcwd(), force_empty_values=True)
@@ -299,6 +300,11 @@ def validate_config(CONFIG: CONFIG_DICT_TYPE) -> None:
                   f"The `pgn_file_grouping` choice of `{config_pgn_choice}` is not valid. "
                   f"Please choose from {valid_pgn_grouping_options}.")
 
+    valid_game_runners = ["process", "thread"]
+    config_assert(CONFIG["game_runner"] in valid_game_runners,
+                  f"The `game_runner` choice of `{CONFIG['game_runner']}` is not valid. "
+                  f"Please choose from {valid_game_runners}.")
+
     matchmaking = CONFIG.get("matchmaking") or {}
     matchmaking_enabled = matchmaking.get("allow_matchmaking") or False
 
@@ -4,9 +4,7 @@ import logging
 import test_bot.lichess
 from lib import model
 from lib import lichess
-from collections.abc import Sequence
 from typing import Union
-MULTIPROCESSING_LIST_TYPE = Sequence[model.Challenge]
 LICHESS_TYPE = Union[lichess.Lichess, test_bot.lichess.Lichess]
 
 logger = logging.getLogger(__name__)
@@ -15,20 +13,17 @@ logger = logging.getLogger(__name__)
 class Conversation:
     """Enables the bot to communicate with its opponent and the spectators."""
 
-    def __init__(self, game: model.Game, li: LICHESS_TYPE, version: str,
-                 challenge_queue: MULTIPROCESSING_LIST_TYPE) -> None:
+    def __init__(self, game: model.Game, li: LICHESS_TYPE, version: str) -> None:
         """
         Communication between lichess-bot and the game chats.
 
         :param game: The game that the bot will send messages to.
         :param li: A class that is used for communication with lichess.
         :param version: The lichess-bot version.
-        :param challenge_queue: The active challenges the bot has.
         """
         self.game = game
         self.li = li
         self.version = version
-        self.challengers = challenge_queue
 
     def react(self, line: ChatLine) -> None:
         """
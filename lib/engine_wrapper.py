@@ -12,9 +12,11 @@ import datetime
 import time
 import random
 import math
+import threading
 import test_bot.lichess
 from collections import Counter
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from lib import config, model, lichess
 from lib.config import Configuration
 from lib.conversation import Conversation
@@ -35,6 +37,14 @@ logger = logging.getLogger(__name__)
 
 out_of_online_opening_book_moves: Counter[str] = Counter()
 
+# The engines kept running between games, waiting for the next one (see `lease_engine`), each with a timer of how long
+# it has waited. A game process keeps the one engine that plays all of its games. When games are played in threads, the
+# threads share these engines, so there are never more engines than games being played at once.
+warm_engines: list[tuple[EngineWrapper, Timer]] = []
+warm_engines_lock = threading.Lock()
+# How long an engine shared by the game threads may wait for a game before `quit_idle_engines` shuts it down.
+ENGINE_IDLE_TIMEOUT = seconds(60)
+
 
 def create_engine(engine_config: config.Configuration, game: Optional[model.Game] = None) -> EngineWrapper:
     """
@@ -70,6 +80,93 @@ def create_engine(engine_config: config.Configuration, game: Optional[model.Game
     return Engine(commands, options, stderr, cfg.draw_or_resign, game, cwd=cfg.working_dir)
 
 
+def start_warm_engine(engine_config: config.Configuration) -> None:
+    """
+    Start the engine that this game process keeps running between its games (see `lease_engine`).
+
+    Called when a process of the game pool starts, so the first game does not wait for the engine to start either. If the
+    engine cannot be started, the error is logged and the first game starts the engine itself.
+
+    :param engine_config: The options for the engine.
+    """
+    try:
+        engine = create_engine(engine_config)
+    except Exception:
+        logger.exception("Could not start the engine ahead of the first game:")
+        return
+    with warm_engines_lock:
+        warm_engines.append((engine, Timer(ENGINE_IDLE_TIMEOUT)))
+
+
+def quit_warm_engines() -> None:
+    """Shut down the engines that are waiting for a game."""
+    with warm_engines_lock:
+        engines = [engine for engine, _ in warm_engines]
+        warm_engines.clear()
+    for engine in engines:
+        engine.__exit__(None, None, None)
+
+
+def quit_idle_engines() -> None:
+    """Shut down the engines that have waited longer than `ENGINE_IDLE_TIMEOUT` for a game."""
+    idle_engines = []
+    with warm_engines_lock:
+        for engine, idle_timer in list(warm_engines):
+            if idle_timer.is_expired():
+                warm_engines.remove((engine, idle_timer))
+                idle_engines.append(engine)
+    for engine in idle_engines:
+        logger.debug(f"Shutting down the engine with pid={engine.get_pid()}, which has not played for a while.")
+        engine.__exit__(None, None, None)
+
+
+@contextmanager
+def lease_engine(engine_config: config.Configuration, game: model.Game) -> Iterator[EngineWrapper]:
+    """
+    Lend a running engine to a game, and take it back when the game is over.
+
+    Starting an engine (the handshake, setting the options, loading network weights) can take seconds, so the engine
+    that finished a game most recently is reused if it still answers a ping. If no engine is waiting, a new one is
+    started. When the game is over, the engine is stopped if it is pondering. An engine that leaves the game with an
+    exception, or does not answer after the game, is shut down instead of being kept.
+
+    :param engine_config: The options for the engine.
+    :param game: The game the engine will play.
+    :return: An engine, ready to play the game.
+    """
+    with warm_engines_lock:
+        engine = warm_engines.pop()[0] if warm_engines else None
+    if engine is not None:
+        try:
+            engine.new_game(game)
+            logger.debug(f"Reusing the engine with pid={engine.get_pid()} for game {game.id}")
+        except Exception:
+            logger.warning(f"The engine with pid={engine.get_pid()} stopped responding. Starting a new one.")
+            engine.engine.close()
+            engine = None
+
+    if engine is None:
+        engine = create_engine(engine_config, game)
+
+    try:
+        yield engine
+    except BaseException as error:
+        engine.__exit__(type(error), error, error.__traceback__)
+        raise
+
+    # An engine that is still pondering when the game ends would keep searching while it waits for the next game. A ping
+    # cancels the ponder search of UCI and XBoard engines.
+    try:
+        engine.stop_pondering()
+        engine.ping()
+    except Exception:
+        logger.warning(f"The engine with pid={engine.get_pid()} stopped responding after game {game.id}. Shutting it down.")
+        engine.engine.close()
+        return
+    with warm_engines_lock:
+        warm_engines.append((engine, Timer(ENGINE_IDLE_TIMEOUT)))
+
+
 def remove_managed_options(config: config.Configuration) -> OPTIONS_TYPE:
     """Remove the options managed by python-chess."""
     def is_managed(key: str) -> bool:
@@ -97,6 +194,8 @@ class EngineWrapper:
         self.go_commands = config.Configuration(options.pop("go_commands", {}) or {})
         self.move_commentary: list[MOVE_INFO_TYPE] = []
         self.comment_start_index = -1
+        self.options = options
+        self.game_options: OPTIONS_TYPE = {}
 
     def configure(self, options: OPTIONS_TYPE, game: Optional[model.Game]) -> None:
         """
@@ -109,10 +208,29 @@ class EngineWrapper:
         try:
             extra_options = {} if game is None else game_specific_options(game)
             self.engine.configure(options | extra_options)
+            self.game_options = extra_options
         except Exception:
             self.engine.close()
             raise
 
+    def new_game(self, game: model.Game) -> None:
+        """
+        Get an engine that has finished a game ready to play another one.
+
+        The engine is pinged first, so an engine that has crashed or stopped responding raises an exception here instead
+        of losing time in the new game. The engine is told about the new game on the first search (`ucinewgame` for UCI
+        engines, `new` for XBoard engines).
+
+        :param game: The new game.
+        """
+        self.stop_pondering()
+        self.ping()
+        self.scores = []
+        self.move_commentary = []
+        self.comment_start_index = -1
+        if game_specific_options(game) != self.game_options:
+            self.configure(self.options, game)
+
     def __enter__(self) -> EngineWrapper:
         """Enter context so engine communication will be properly shutdown."""
         self.engine.__enter__()
@@ -155,6 +273,8 @@ class EngineWrapper:
         :param conversation: The conversation with the user and spectators.
         :return: The move to play.
         """
+        self.stop_pondering()
+
         polyglot_cfg = engine_cfg.polyglot
         online_moves_cfg = engine_cfg.online_moves
         draw_or_resign_cfg = engine_cfg.draw_or_resign
@@ -204,6 +324,21 @@ class EngineWrapper:
             li.resign(game.id)
         else:
             li.make_move(game.id, best_move)
+            if can_ponder:
+                self.start_pondering(board, best_move)
+
+    def start_pondering(self, board: chess.Board, best_move: chess.engine.PlayResult) -> None:
+        """
+        Start thinking on the opponent's time.
+
+        UCI and XBoard engines ponder on their own when `search` is called with `ponder=True`, so this does nothing.
+
+        :param board: The position the move was played from.
+        :param best_move: The move played and the expected reply.
+        """
+
+    def stop_pondering(self) -> None:
+        """Stop thinking on the opponent's time. Does nothing for engines that ponder on their own."""
 
     def add_go_commands(self, time_limit: chess.engine.Limit) -> chess.engine.Limit:
         """Add extra commands to send to the engine. For example, to search for 1000 nodes or up to depth 10."""
@@ -267,7 +402,8 @@ class EngineWrapper:
                                   info=chess.engine.INFO_ALL,
                                   ponder=ponder,
                                   draw_offered=draw_offered,
-                                  root_moves=root_moves if isinstance(root_moves, list) else None)
+                                  root_moves=root_moves if isinstance(root_moves, list) else None,
+                                  game=game.id)
         # Use null_score to have no effect on draw/resign decisions
         null_score = chess.engine.PovScore(chess.engine.Mate(1), board.turn)
         self.scores.append(result.info.get("score", null_score))
@@ -445,6 +581,7 @@ class EngineWrapper:
         :param game: The final game state from lichess.
         :param board: The final board state.
         """
+        self.stop_pondering()
         termination = game.state.get("status")
         winner = game.state.get("winner")
         winning_color = chess.WHITE if winner == "white" else chess.BLACK
@@ -552,6 +689,10 @@ class MinimalEngine(EngineWrapper):
 
         self.engine = FillerEngine(self, name=self.engine_name)
 
+        self.ponder_board: Optional[chess.Board] = None
+        self.ponder_thread: Optional[threading.Thread] = None
+        self.ponder_stop = threading.Event()
+
     def get_pid(self) -> str:
         """Homemade engines don't have a pid, so we return a question mark."""
         return "?"
@@ -566,6 +707,51 @@ class MinimalEngine(EngineWrapper):
         """
         raise NotImplementedError("The search method is not implemented")
 
+    def ponder(self, board: chess.Board, stop: threading.Event) -> None:
+        """
+        Think about `board` on the opponent's time.
+
+        Called in a background thread after the bot plays a move that came with an expected reply (`PlayResult.ponder`).
+        `board` is the position after that reply. Search until `stop` is set, and keep what was learned (e.g. in a
+        transposition table) for the next call to `search`. `self.ponder_board` can be compared with the board passed to
+        `search` to tell whether the opponent played the expected reply.
+        NOTE: The default does nothing. Override it to make use of the opponent's time.
+        """
+
+    def start_pondering(self, board: chess.Board, best_move: chess.engine.PlayResult) -> None:
+        """
+        Start `ponder` in a background thread on the position after the move played and the expected reply.
+
+        :param board: The position the move was played from.
+        :param best_move: The move played and the expected reply.
+        """
+        self.stop_pondering()
+        if best_move.move is None or best_move.ponder is None:
+            return
+
+        ponder_board = board.copy()
+        ponder_board.push(best_move.move)
+        if not ponder_board.is_legal(best_move.ponder):
+            return
+        ponder_board.push(best_move.ponder)
+
+        self.ponder_board = ponder_board
+        self.ponder_stop = threading.Event()
+        self.ponder_thread = threading.Thread(target=self.ponder, args=(ponder_board.copy(), self.ponder_stop), daemon=True)
+        self.ponder_thread.start()
+
+    def stop_pondering(self) -> None:
+        """Stop the ponder thread and wait for it to finish."""
+        if self.ponder_thread is not None:
+            self.ponder_stop.set()
+            self.ponder_thread.join()
+            self.ponder_thread = None
+
+    def quit(self) -> None:
+        """Stop pondering before shutting down."""
+        self.stop_pondering()
+        super().quit()
+
     def notify(self, method_name: str, *args: Any, **kwargs: Any) -> None:
         """
         Enable the use of `self.engine.option1`.
@@ -0,0 +1,220 @@
+"""
+Run an engine over EPD test suites to check that changes to it don't cost strength.
+
+Run with `python -m lib.epd_runner <engine name> --time 1` from the lichess-bot directory. Without an engine name, the
+engine in the config is used, so UCI and XBoard engines can be tested too. The positions are searched in parallel by a
+pool of processes, each with its own copy of the engine. By default, the suites in `lib/epd` are run; pick others with
+`--epd <file>`.
+"""
+from __future__ import annotations
+import argparse
+import chess
+import chess.engine
+import glob
+import json
+import logging
+import multiprocessing
+import os
+from multiprocessing import util
+from typing import Any, Optional
+from lib import config
+from lib.bench import load_engine_config, search_position
+from lib.engine_wrapper import EngineWrapper, create_engine
+
+logger = logging.getLogger(__name__)
+
+EPD_DIRECTORY = os.path.join(os.path.dirname(__file__), "epd")
+EPD_RESULT_TYPE = dict[str, Any]
+
+# The engine of a worker process, created by start_worker.
+worker_engine: Optional[EngineWrapper] = None
+
+
+def epd_moves(operation: Any) -> list[str]:
+    """Get the moves of a `bm` or `am` operation, parsed by `chess.Board.from_epd`, in UCI notation."""
+    return [move.uci() for move in operation if isinstance(move, chess.Move)] if isinstance(operation, list) else []
+
+
+class EpdPosition:
+    """A position of an EPD test suite."""
+
+    def __init__(self, suite: str, line: str) -> None:
+        """
+        Parse a line of an EPD file.
+
+        :param suite: The name of the suite (the file name without the extension).
+        :param line: The EPD line, with `bm` (best moves) and/or `am` (moves to avoid) operations.
+        """
+        board, operations = chess.Board.from_epd(line)
+        self.suite = suite
+        self.fen = board.fen()
+        self.id = str(operations.get("id", f"{suite}.{board.fen()}"))
+        self.best_moves = epd_moves(operations.get("bm"))
+        self.avoid_moves = epd_moves(operations.get("am"))
+
+    def is_solved_by(self, move: Optional[str]) -> bool:
+        """Whether `move` (in UCI notation) is one of the best moves and is not one of the moves to avoid."""
+        return (move is not None and (not self.best_moves or move in self.best_moves)
+                and move not in self.avoid_moves)
+
+
+def read_epd_file(path: str) -> list[EpdPosition]:
+    """Read the positions of an EPD file that have a `bm` or `am` operation."""
+    suite = os.path.splitext(os.path.basename(path))[0]
+    with open(path) as epd_file:
+        positions = [EpdPosition(suite, line) for line in epd_file if line.strip() and not line.startswith("#")]
+    return [position for position in positions if position.best_moves or position.avoid_moves]
+
+
+def budget_steps(limit: chess.engine.Limit, steps: int) -> list[chess.engine.Limit]:
+    """
+    Split a time or node budget into a ladder of growing budgets, ending with the full budget.
+
+    e.g. 1 second with 3 steps gives 0.125, 0.25, 0.5 and 1 second.
+    """
+    budgets = []
+    for step in range(steps, -1, -1):
+        fraction = 2 ** -step
+        budgets.append(chess.engine.Limit(time=limit.time * fraction if limit.time is not None else None,
+                                          nodes=max(1, int(limit.nodes * fraction)) if limit.nodes is not None else None))
+    return budgets
+
+
+def start_worker(engine_config: config.Configuration) -> None:
+    """Create the engine of a worker process, and quit it when the process exits."""
+    global worker_engine
+    worker_engine = create_engine(engine_config)
+    util.Finalize(None, worker_engine.quit, exitpriority=16)
+
+
+def solve_position(position: EpdPosition, limit: chess.engine.Limit, steps: int) -> EPD_RESULT_TYPE:
+    """
+    Search a position with the worker's engine.
+
+    The smaller budgets of the ladder are searched first, each from a fresh game, to find the time to solution: how long
+    the search took with the smallest budget that found a solution. The full budget decides whether it is solved.
+    """
+    assert worker_engine is not None
+    board = chess.Board(position.fen)
+    budgets = budget_steps(limit, steps)
+    time_to_solution = None
+    for step, budget in enumerate(budgets[:-1]):
+        result, elapsed = search_position(worker_engine, board, budget, f"{position.id} {step}")
+        if position.is_solved_by(result.move.uci() if result.move is not None else None):
+            time_to_solution = elapsed
+            break
+
+    result, elapsed = search_position(worker_engine, board, budgets[-1], position.id)
+    move = result.move.uci() if result.move is not None else None
+    solved = position.is_solved_by(move)
+    if solved and time_to_solution is None:
+        time_to_solution = elapsed
+    return {"id": position.id,
+            "suite": position.suite,
+            "fen": position.fen,
+            "best_moves": position.best_moves,
+            "avoid_moves": position.avoid_moves,
+            "move": move,
+            "solved": solved,
+            "time": elapsed,
+            "nodes": result.info.get("nodes"),
+            "depth": result.info.get("depth"),
+            "time_to_solution": time_to_solution if solved else None}
+
+
+def solve_task(task: tuple[EpdPosition, chess.engine.Limit, int]) -> EPD_RESULT_TYPE:
+    """Unpack the arguments of solve_position for the process pool."""
+    return solve_position(*task)
+
+
+def run_suites(engine_config: config.Configuration, positions: list[EpdPosition], limit: chess.engine.Limit,
+               workers: int, steps: int = 3) -> EPD_RESULT_TYPE:
+    """
+    Search every position and summarize the results by suite.
+
+    :param engine_config: The config to create the engines from, as for `create_engine`.
+    :param positions: The positions to search.
+    :param limit: The time or node budget of each position.
+    :param workers: How many processes search positions at the same time. Each has its own engine.
+    :param steps: How many smaller budgets are tried first to find the time to solution.
+    :return: The result of each position and the solved counts of each suite, ready to be written as JSON.
+    """
+    tasks = [(position, limit, steps) for position in positions]
+    if workers <= 1:
+        start_worker(engine_config)
+        results = list(map(solve_task, tasks))
+    else:
+        with multiprocessing.Pool(workers, initializer=start_worker, initargs=(engine_config,)) as pool:
+            results = list(pool.imap(solve_task, tasks))
+            pool.close()
+            pool.join()
+
+    suites: dict[str, EPD_RESULT_TYPE] = {}
+    for result in results:
+        suite = suites.setdefault(result["suite"], {"positions": 0, "solved": 0, "time_to_solution": 0.0})
+        suite["positions"] += 1
+        if result["solved"]:
+            suite["solved"] += 1
+            suite["time_to_solution"] += result["time_to_solution"]
+    for suite in suites.values():
+        suite["average_time_to_solution"] = suite.pop("time_to_solution") / suite["solved"] if suite["solved"] else None
+
+    return {"engine": engine_config.engine.name,
+            "limit": {"time": limit.time, "nodes": limit.nodes},
+            "suites": suites,
+            "solved": sum(suite["solved"] for suite in suites.values()),
+            "positions": len(results),
+            "results": results}
+
+
+def format_results(run: EPD_RESULT_TYPE) -> list[str]:
+    """Get the lines of a human-readable summary of a run: the positions that were not solved and the solved counts."""
+    lines = []
+    for result in run["results"]:
+        if not result["solved"]:
+            expected = " ".join(result["best_moves"]) or "not " + " ".join(result["avoid_moves"])
+            lines.append(f"Failed {result['id']}: played {result['move']}, expected {expected}")
+    for name, suite in run["suites"].items():
+        average = suite["average_time_to_solution"]
+        time_to_solution = f", average time to solution {average:.3f} s" if average is not None else ""
+        lines.append(f"{name}: solved {suite['solved']} of {suite['positions']}{time_to_solution}")
+    lines.append(f"Total: solved {run['solved']} of {run['positions']}")
+    return lines
+
+
+def main() -> None:
+    """Run EPD test suites from the command line."""
+    parser = argparse.ArgumentParser(description="Run an engine over EPD test suites.")
+    parser.add_argument("engine", nargs="?", help="The name of a homemade engine class in homemade.py. Defaults to the "
+                                                  "engine in the config.")
+    parser.add_argument("--epd", action="append", help="An EPD file to run. Can be given more than once (defaults to the "
+                                                       "suites in lib/epd).")
+    parser.add_argument("--config", help="The config to create the engine from (defaults to ./config.yml, or "
+                                         "./config.yml.default if there is none).")
+    parser.add_argument("--time", type=float, help="Seconds to search each position (defaults to 1 when there is no "
+                                                   "node limit).")
+    parser.add_argument("--nodes", type=int, help="Nodes to search each position.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="How many positions to search at the same time (defaults to the number of CPUs).")
+    parser.add_argument("--json", help="Write the results to this file as JSON.")
+    parser.add_argument("-v", action="store_true", help="Show the engine's debug logging.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.v else logging.WARNING)
+    config_file = args.config or ("./config.yml" if os.path.isfile("./config.yml") else "./config.yml.default")
+    engine_config = load_engine_config(config_file, args.engine)
+    limit = chess.engine.Limit(time=args.time if args.time is not None or args.nodes is not None else 1.0,
+                               nodes=args.nodes)
+
+    epd_files = args.epd or sorted(glob.glob(os.path.join(EPD_DIRECTORY, "*.epd")))
+    positions = [position for epd_file in epd_files for position in read_epd_file(epd_file)]
+    run = run_suites(engine_config, positions, limit, args.workers)
+
+    print("\n".join(format_results(run)))
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(run, json_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
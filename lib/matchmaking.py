@@ -12,7 +12,7 @@ from lib.config import Configuration, FilterType
 from typing import Any, Optional, Union
 USER_PROFILE_TYPE = dict[str, Any]
 EVENT_TYPE = dict[str, Any]
-MULTIPROCESSING_LIST_TYPE = Sequence[model.Challenge]
+CHALLENGE_QUEUE_TYPE = Sequence[model.Challenge]
 DAILY_TIMERS_TYPE = list[Timer]
 LICHESS_TYPE = Union[lichess.Lichess, test_bot.lichess.Lichess]
 
@@ -244,7 +244,7 @@ class Matchmaking:
         value: str = config.lookup(parameter)
         return value if value != "random" else random.choice(choices)
 
-    def challenge(self, active_games: set[str], challenge_queue: MULTIPROCESSING_LIST_TYPE, max_games: int) -> None:
+    def challenge(self, active_games: set[str], challenge_queue: CHALLENGE_QUEUE_TYPE, max_games: int) -> None:
         """
         Challenge an opponent.
 
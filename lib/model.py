@@ -1,4 +1,5 @@
 """Store information about a challenge, game or player in a class."""
+from __future__ import annotations
 import math
 from urllib.parse import urljoin
 import logging
@@ -6,7 +7,7 @@ import datetime
 from enum import Enum
 from lib.timer import Timer, msec, seconds, sec_str, to_msec, to_seconds, years
 from lib.config import Configuration
-from typing import Any
+from typing import Any, Optional
 from collections import defaultdict
 
 logger = logging.getLogger(__name__)
@@ -266,6 +267,34 @@ class Game:
         return self.__str__()
 
 
+class GameSnapshot:
+    """
+    Store what is needed to tell whether the moves of a game changed since an earlier game state.
+
+    A move played or taken back changes the number of moves or the last move, so only these are kept, instead of a copy
+    of the whole `Game`.
+    """
+
+    def __init__(self, game: Game, move_count: int) -> None:
+        """
+        Take a snapshot of the current state of a game.
+
+        :param game: The game in the state to keep.
+        :param move_count: The number of moves played in the game.
+        """
+        moves: str = game.state["moves"]
+        self.move_count = move_count
+        self.last_move = moves[moves.rfind(" ") + 1:]
+
+    def moves_changed(self, prior: Optional[GameSnapshot]) -> bool:
+        """Whether a move was played or taken back since an earlier snapshot."""
+        return prior is None or (self.move_count, self.last_move) != (prior.move_count, prior.last_move)
+
+    def __repr__(self) -> str:
+        """Get a string representation of `GameSnapshot`."""
+        return f"GameSnapshot({vars(self)})"
+
+
 class Player:
     """Store information about a player."""
 
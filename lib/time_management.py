@@ -0,0 +1,127 @@
+"""Per-move time budgets for homemade engines, based on the live game clock."""
+from __future__ import annotations
+import chess
+import chess.engine
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TimeBudget:
+    """How long to think about one move."""
+
+    def __init__(self, soft: Optional[float], hard: Optional[float], panic: bool = False) -> None:
+        """
+        Hold the time budget of a move.
+
+        :param soft: Seconds after which no new search iteration should be started. None means no time limit.
+        :param hard: Seconds after which the search must stop, even in the middle of an iteration. None means no time limit.
+        :param panic: Whether the clock is so low that the budget was cut to the minimum.
+        """
+        self.soft = soft
+        self.hard = hard
+        self.panic = panic
+
+    def __repr__(self) -> str:
+        """Get a string representation of the budget."""
+        return f"TimeBudget(soft={self.soft}, hard={self.hard}, panic={self.panic})"
+
+
+def position_complexity(board: chess.Board) -> float:
+    """
+    Estimate how much thought a position deserves, as a factor around 1.0 to scale the time budget by.
+
+    Positions with more legal moves and with captures available get more time. A position with a single legal move gets
+    no time at all.
+    """
+    legal_moves = board.legal_moves.count()
+    if legal_moves <= 1:
+        return 0.0
+    complexity = 0.75 + 0.5 * min(legal_moves, 50) / 50
+    if any(board.generate_legal_captures()):
+        complexity += 0.15
+    return complexity
+
+
+class TimeManager:
+    """
+    Split the remaining clock into time budgets for each move.
+
+    Any MinimalEngine can use this. Call `budget` with the `chess.engine.Limit` passed to `search`, then stop starting new
+    iterations after `soft` seconds and stop searching after `hard` seconds.
+    """
+
+    def __init__(self,
+                 moves_to_go: int = 40,
+                 min_moves_to_go: int = 20,
+                 increment_share: float = 0.75,
+                 hard_factor: float = 3.0,
+                 max_clock_share: float = 0.5,
+                 panic_time: float = 5.0,
+                 min_time: float = 0.01) -> None:
+        """
+        Configure how the clock is shared out.
+
+        :param moves_to_go: How many more moves the game is expected to last at the start.
+        :param min_moves_to_go: The fewest moves the game is ever expected to last, however long it has gone on.
+        :param increment_share: How much of the increment to use on each move.
+        :param hard_factor: How many times the soft limit the search may run before it has to stop.
+        :param max_clock_share: The largest part of the remaining clock that may be used on one move.
+        :param panic_time: Below this many seconds on the clock, only the minimum is spent on each move.
+        :param min_time: The shortest time budget, in seconds.
+        """
+        self.moves_to_go = moves_to_go
+        self.min_moves_to_go = min_moves_to_go
+        self.increment_share = increment_share
+        self.hard_factor = hard_factor
+        self.max_clock_share = max_clock_share
+        self.panic_time = panic_time
+        self.min_time = min_time
+
+    def expected_moves_to_go(self, board: chess.Board, time_limit: chess.engine.Limit) -> int:
+        """Get how many more moves the clock has to last."""
+        if time_limit.remaining_moves:
+            return time_limit.remaining_moves
+        return max(self.min_moves_to_go, self.moves_to_go - board.fullmove_number // 2)
+
+    def budget(self, board: chess.Board, time_limit: Optional[chess.engine.Limit],
+               complexity: Optional[float] = None) -> TimeBudget:
+        """
+        Get the time budget for the side to move.
+
+        :param board: The current position.
+        :param time_limit: The limit passed to the engine's `search`, with the clock already reduced by the move overhead.
+        :param complexity: A factor to scale the budget by. Defaults to `position_complexity(board)`.
+        :return: The soft and hard time limits of the move.
+        """
+        if time_limit is None:
+            return TimeBudget(None, None)
+
+        if time_limit.time is not None:
+            # A fixed time per move (movetime, correspondence, or the first move).
+            return TimeBudget(time_limit.time, time_limit.time)
+
+        if board.turn == chess.WHITE:
+            clock, increment = time_limit.white_clock, time_limit.white_inc
+        else:
+            clock, increment = time_limit.black_clock, time_limit.black_inc
+        if clock is None:
+            return TimeBudget(None, None)
+        increment = increment or 0.0
+        max_time = max(self.min_time, clock * self.max_clock_share)
+
+        if complexity is None:
+            complexity = position_complexity(board)
+
+        if clock <= self.panic_time:
+            # Play fast and live off the increment until the clock recovers.
+            soft = min(max_time, max(self.min_time, clock / (2 * self.moves_to_go) + increment * self.increment_share / 2))
+            budget = TimeBudget(soft, min(max_time, soft * 2), True)
+        else:
+            base_time = clock / self.expected_moves_to_go(board, time_limit) + increment * self.increment_share
+            soft = min(max_time, max(self.min_time, base_time * complexity))
+            budget = TimeBudget(soft, min(max_time, max(soft, base_time * self.hard_factor)))
+
+        logger.debug(f"Time budget with {clock:.1f} s on the clock: {budget}")
+        return budget
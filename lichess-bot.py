@@ -1,4 +1,5 @@
 """The main module that controls lichess-bot."""
+from __future__ import annotations
 import argparse
 import chess
 import chess.pgn
@@ -14,7 +15,6 @@ import datetime
 import backoff
 import os
 import io
-import copy
 import math
 import sys
 import yaml
@@ -29,17 +29,19 @@ from collections import defaultdict
 from collections.abc import Iterator, MutableSequence
 from http.client import RemoteDisconnected
 from queue import Queue, Empty
+from multiprocessing import util
 from multiprocessing.pool import Pool
-from typing import Any, Optional, Union
+from typing import Any, Optional, Union, TYPE_CHECKING
 USER_PROFILE_TYPE = dict[str, Any]
 EVENT_TYPE = dict[str, Any]
 PLAY_GAME_ARGS_TYPE = dict[str, Any]
 EVENT_GETATTR_GAME_TYPE = dict[str, Any]
 GAME_EVENT_TYPE = dict[str, Any]
-CONTROL_QUEUE_TYPE = Queue[EVENT_TYPE]
 CORRESPONDENCE_QUEUE_TYPE = Queue[str]
-LOGGING_QUEUE_TYPE = Queue[logging.LogRecord]
-MULTIPROCESSING_LIST_TYPE = MutableSequence[model.Challenge]
+CHALLENGE_QUEUE_TYPE = MutableSequence[model.Challenge]
+if TYPE_CHECKING:
+    CONTROL_QUEUE_TYPE = multiprocessing.queues.Queue[EVENT_TYPE]
+    LOGGING_QUEUE_TYPE = multiprocessing.queues.Queue[Optional[logging.LogRecord]]
 POOL_TYPE = Pool
 LICHESS_TYPE = Union[lichess.Lichess, test_bot.lichess.Lichess]
 
@@ -179,36 +181,105 @@ def logging_listener_proc(queue: LOGGING_QUEUE_TYPE, level: int, log_filename: O
 
     This allows the logs from inside a thread to be printed.
     They are added to the queue, so they are printed outside the thread.
+    A `None` in the queue means that lichess-bot is shutting down and all earlier records have been handled.
     """
     logging_configurer(level, log_filename, auto_log_filename, False)
     logger = logging.getLogger()
     while True:
-        task: Optional[logging.LogRecord] = None
         try:
-            task = queue.get(block=False)
+            task: Optional[logging.LogRecord] = queue.get(block=False)
         except Empty:
             time.sleep(0.1)
+            continue
         except InterruptedError:
-            pass
+            continue
         except Exception:
-            pass
+            continue
 
         if task is None:
-            continue
+            break
 
         logger.handle(task)
-        queue.task_done()
 
 
 def thread_logging_configurer(queue: LOGGING_QUEUE_TYPE) -> None:
     """Configure the game logger."""
-    h = logging.handlers.QueueHandler(queue)
     root = logging.getLogger()
-    root.handlers.clear()
-    root.addHandler(h)
+    # Replaced in one step, since games played in threads log while another game configures the logger.
+    root.handlers = [logging.handlers.QueueHandler(queue)]
     root.setLevel(logging.DEBUG)
 
 
+# The queues of a worker of the game pool. Multiprocessing queues cannot be sent along with each game, so they are given
+# to the worker when it starts.
+process_control_queue: Optional[CONTROL_QUEUE_TYPE] = None
+process_logging_queue: Optional[LOGGING_QUEUE_TYPE] = None
+
+
+def game_process_initializer(config: Configuration, control_queue: CONTROL_QUEUE_TYPE,
+                             logging_queue: LOGGING_QUEUE_TYPE) -> None:
+    """
+    Set up a process of the game pool: keep its queues, and start the engine that its games share.
+
+    :param config: The config that the bot will use.
+    :param control_queue: The queue containing all the events.
+    :param logging_queue: The logging queue. Used by `logging_listener_proc`.
+    """
+    global process_control_queue, process_logging_queue
+    process_control_queue = control_queue
+    process_logging_queue = logging_queue
+    thread_logging_configurer(logging_queue)
+    engine_wrapper.start_warm_engine(config)
+    util.Finalize(None, engine_wrapper.quit_warm_engines, exitpriority=16)
+
+    def exit_on_sigterm(signal_number: int, frame: Any) -> None:
+        # The pool is terminated with SIGTERM, which would skip the finalizers and leave the engine running in its own
+        # process group. Raising SystemExit unwinds the worker instead, and the finalizer above shuts the engine down
+        # outside of the signal handler. A second SIGTERM kills the process.
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        raise SystemExit(128 + signal_number)
+
+    signal.signal(signal.SIGTERM, exit_on_sigterm)
+
+
+def game_thread_initializer(control_queue: CONTROL_QUEUE_TYPE, logging_queue: LOGGING_QUEUE_TYPE) -> None:
+    """
+    Set up a thread of the game pool when games are played in threads (`game_runner: thread`).
+
+    The thread shares the queues, the logger, and the signal handlers of the main process. No engine is started here: the
+    threads share the engines that are waiting for a game, and a game starts a new one only if none is waiting. Engines
+    that wait too long are shut down by `lichess_bot_main`, and the rest after the pool is closed.
+
+    :param control_queue: The queue containing all the events.
+    :param logging_queue: The logging queue. Used by `logging_listener_proc`.
+    """
+    global process_control_queue, process_logging_queue
+    process_control_queue = control_queue
+    process_logging_queue = logging_queue
+
+
+def create_game_pool(config: Configuration, control_queue: CONTROL_QUEUE_TYPE, logging_queue: LOGGING_QUEUE_TYPE) -> POOL_TYPE:
+    """
+    Create the pool that plays the games, with one more worker than the number of games that can be played at once.
+
+    Each game is played in its own process by default. With `game_runner: thread`, the games are played in threads of the
+    main process instead, which saves the memory of an interpreter per game but not the worker or the engine of each game
+    being played. Correspondence games free both when they disconnect (see `should_exit_game`).
+
+    :param config: The config that the bot will use.
+    :param control_queue: The queue containing all the events.
+    :param logging_queue: The logging queue. Used by `logging_listener_proc`.
+    """
+    workers = config.challenge.concurrency + 1
+    if config.game_runner == "thread":
+        return multiprocessing.pool.ThreadPool(workers,
+                                               initializer=game_thread_initializer,
+                                               initargs=(control_queue, logging_queue))
+    return multiprocessing.pool.Pool(workers,
+                                     initializer=game_process_initializer,
+                                     initargs=(config, control_queue, logging_queue))
+
+
 def start(li: LICHESS_TYPE, user_profile: USER_PROFILE_TYPE, config: Configuration, logging_level: int,
           log_filename: Optional[str], auto_log_filename: Optional[str], one_game: bool = False) -> None:
     """
@@ -223,18 +294,17 @@ def start(li: LICHESS_TYPE, user_profile: USER_PROFILE_TYPE, config: Configurati
     :param one_game: Whether the bot should play only one game. Only used in `test_bot/test_bot.py` to test lichess-bot.
     """
     logger.info(f"You're now connected to {config.url} and awaiting challenges.")
-    manager = multiprocessing.Manager()
-    challenge_queue: MULTIPROCESSING_LIST_TYPE = manager.list()
-    control_queue: CONTROL_QUEUE_TYPE = manager.Queue()
+    challenge_queue: CHALLENGE_QUEUE_TYPE = []
+    control_queue: CONTROL_QUEUE_TYPE = multiprocessing.Queue()
     control_stream = multiprocessing.Process(target=watch_control_stream, args=(control_queue, li))
     control_stream.start()
     correspondence_pinger = multiprocessing.Process(target=do_correspondence_ping,
                                                     args=(control_queue,
                                                           seconds(config.correspondence.checkin_period)))
     correspondence_pinger.start()
-    correspondence_queue: CORRESPONDENCE_QUEUE_TYPE = manager.Queue()
+    correspondence_queue: CORRESPONDENCE_QUEUE_TYPE = Queue()
 
-    logging_queue = manager.Queue()
+    logging_queue: LOGGING_QUEUE_TYPE = multiprocessing.Queue()
     logging_listener = multiprocessing.Process(target=logging_listener_proc,
                                                args=(logging_queue,
                                                      logging_level,
@@ -257,10 +327,15 @@ def start(li: LICHESS_TYPE, user_profile: USER_PROFILE_TYPE, config: Configurati
         control_stream.join()
         correspondence_pinger.terminate()
         correspondence_pinger.join()
-        time.sleep(1.0)  # Allow final messages in logging_queue to be handled.
         logging_configurer(logging_level, log_filename, auto_log_filename, False)
-        logging_listener.terminate()
-        logging_listener.join()
+        # A native queue cannot exit while its pipe still holds records, so let the listener drain it before stopping.
+        logging_queue.put(None)
+        logging_listener.join(timeout=5)
+        if logging_listener.is_alive():
+            # A game process that was stopped in the middle of logging left the queue locked.
+            logging_listener.terminate()
+            logging_listener.join()
+            logging_queue.cancel_join_thread()
 
 
 def log_proc_count(change: str, active_games: set[str]) -> None:
@@ -277,7 +352,7 @@ def log_proc_count(change: str, active_games: set[str]) -> None:
 def lichess_bot_main(li: LICHESS_TYPE,
                      user_profile: USER_PROFILE_TYPE,
                      config: Configuration,
-                     challenge_queue: MULTIPROCESSING_LIST_TYPE,
+                     challenge_queue: CHALLENGE_QUEUE_TYPE,
                      control_queue: CONTROL_QUEUE_TYPE,
                      correspondence_queue: CORRESPONDENCE_QUEUE_TYPE,
                      logging_queue: LOGGING_QUEUE_TYPE,
@@ -314,12 +389,8 @@ def lichess_bot_main(li: LICHESS_TYPE,
     matchmaker.show_earliest_challenge_time()
 
     play_game_args = {"li": li,
-                      "control_queue": control_queue,
                       "user_profile": user_profile,
-                      "config": config,
-                      "challenge_queue": challenge_queue,
-                      "correspondence_queue": correspondence_queue,
-                      "logging_queue": logging_queue}
+                      "config": config}
 
     recent_bot_challenges: defaultdict[str, list[Timer]] = defaultdict(list)
 
@@ -327,16 +398,16 @@ def lichess_bot_main(li: LICHESS_TYPE,
         logger.info("When quitting, lichess-bot will first wait for all running games to finish.")
         logger.info("Press Ctrl-C twice to quit immediately.")
 
-    with multiprocessing.pool.Pool(max_games + 1) as pool:
+    with create_game_pool(config, control_queue, logging_queue) as pool:
         while not (terminated or (one_game and one_game_completed) or restart):
             event = next_event(control_queue)
+            engine_wrapper.quit_idle_engines()
             if not event:
                 continue
 
             if event["type"] == "terminated":
                 restart = True
                 logger.debug(f"Terminating exception:\n{event['error']}")
-                control_queue.task_done()
                 break
             elif event["type"] == "local_game_done":
                 active_games.discard(event["game"]["id"])
@@ -371,14 +442,19 @@ def lichess_bot_main(li: LICHESS_TYPE,
             matchmaker.challenge(active_games, challenge_queue, max_games)
             check_online_status(li, user_profile, last_check_online_time)
 
-            control_queue.task_done()
-
         close_pool(pool, active_games, config)
 
+    engine_wrapper.quit_warm_engines()
+
 
 def close_pool(pool: POOL_TYPE, active_games: set[str], config: Configuration) -> None:
-    """Shut down pool after possibly waiting on games to finish depending on the configuration."""
-    if config.quit_after_all_games_finish:
+    """
+    Shut down pool after possibly waiting on games to finish depending on the configuration.
+
+    Idle game processes are always allowed to exit on their own. Terminating a process while it is writing to the logging
+    queue would leave the queue locked.
+    """
+    if config.quit_after_all_games_finish or not active_games:
         if active_games:
             logger.info("Waiting for games to finish before quitting.")
         pool.close()
@@ -397,7 +473,6 @@ def next_event(control_queue: CONTROL_QUEUE_TYPE) -> EVENT_TYPE:
     if "type" not in event:
         logger.warning("Unable to handle response from lichess.org:")
         logger.warning(event)
-        control_queue.task_done()
         return {}
 
     if event.get("type") != "ping":
@@ -412,7 +487,7 @@ correspondence_games_to_start = 0
 def check_in_on_correspondence_games(pool: POOL_TYPE,
                                      event: EVENT_TYPE,
                                      correspondence_queue: CORRESPONDENCE_QUEUE_TYPE,
-                                     challenge_queue: MULTIPROCESSING_LIST_TYPE,
+                                     challenge_queue: CHALLENGE_QUEUE_TYPE,
                                      play_game_args: PLAY_GAME_ARGS_TYPE,
                                      active_games: set[str],
                                      max_games: int) -> None:
@@ -423,6 +498,8 @@ def check_in_on_correspondence_games(pool: POOL_TYPE,
         correspondence_games_to_start = correspondence_queue.qsize()
     elif event["type"] != "local_game_done":
         return
+    elif event["game"].get("resume"):
+        correspondence_queue.put_nowait(event["game"]["id"])
 
     if challenge_queue:
         return
@@ -443,7 +520,7 @@ def start_low_time_games(low_time_games: list[EVENT_GETATTR_GAME_TYPE], active_g
         start_game_thread(active_games, game_id, play_game_args, pool)
 
 
-def accept_challenges(li: LICHESS_TYPE, challenge_queue: MULTIPROCESSING_LIST_TYPE, active_games: set[str],
+def accept_challenges(li: LICHESS_TYPE, challenge_queue: CHALLENGE_QUEUE_TYPE, active_games: set[str],
                       max_games: int) -> None:
     """Accept a challenge."""
     while len(active_games) < max_games and challenge_queue:
@@ -475,7 +552,7 @@ def check_online_status(li: LICHESS_TYPE, user_profile: USER_PROFILE_TYPE, last_
             pass
 
 
-def sort_challenges(challenge_queue: MULTIPROCESSING_LIST_TYPE, challenge_config: Configuration) -> None:
+def sort_challenges(challenge_queue: CHALLENGE_QUEUE_TYPE, challenge_config: Configuration) -> None:
     """
     Sort the challenges.
 
@@ -499,17 +576,21 @@ def start_game_thread(active_games: set[str], game_id: str, play_game_args: PLAY
     log_proc_count("Used", active_games)
     play_game_args["game_id"] = game_id
 
-    def game_error_handler(error: BaseException) -> None:
-        logger.exception("Game ended due to error:", exc_info=error)
-        control_queue: CONTROL_QUEUE_TYPE = play_game_args["control_queue"]
-        li = play_game_args["li"]
-        control_queue.put_nowait({"type": "local_game_done", "game": {"id": game_id,
-                                                                      "pgn": li.get_game_pgn(game_id),
-                                                                      "complete": not game_is_active(li, game_id)}})
+    pool.apply_async(play_game_in_process, kwds=play_game_args)
 
-    pool.apply_async(play_game,
-                     kwds=play_game_args,
-                     error_callback=game_error_handler)
+
+def play_game_in_process(**play_game_args: Any) -> None:
+    """Play a game in a worker of the game pool, with the queues the worker was started with."""
+    assert process_control_queue is not None and process_logging_queue is not None
+    try:
+        play_game(control_queue=process_control_queue, logging_queue=process_logging_queue, **play_game_args)
+    except Exception:
+        logger.exception("Game ended due to error:")
+        li = play_game_args["li"]
+        game_id = play_game_args["game_id"]
+        process_control_queue.put_nowait({"type": "local_game_done", "game": {"id": game_id,
+                                                                              "pgn": li.get_game_pgn(game_id),
+                                                                              "complete": not game_is_active(li, game_id)}})
 
 
 def start_game(event: EVENT_TYPE,
@@ -553,7 +634,7 @@ def enough_time_to_queue(event: EVENT_TYPE, config: Configuration) -> bool:
     return not game["isMyTurn"] or game.get("secondsLeft", math.inf) > minimum_time
 
 
-def handle_challenge(event: EVENT_TYPE, li: LICHESS_TYPE, challenge_queue: MULTIPROCESSING_LIST_TYPE,
+def handle_challenge(event: EVENT_TYPE, li: LICHESS_TYPE, challenge_queue: CHALLENGE_QUEUE_TYPE,
                      challenge_config: Configuration, user_profile: USER_PROFILE_TYPE,
                      recent_bot_challenges: defaultdict[str, list[Timer]]) -> None:
     """Handle incoming challenges. It either accepts, declines, or queues them to accept later."""
@@ -579,8 +660,6 @@ def play_game(li: LICHESS_TYPE,
               control_queue: CONTROL_QUEUE_TYPE,
               user_profile: USER_PROFILE_TYPE,
               config: Configuration,
-              challenge_queue: MULTIPROCESSING_LIST_TYPE,
-              correspondence_queue: CORRESPONDENCE_QUEUE_TYPE,
               logging_queue: LOGGING_QUEUE_TYPE) -> None:
     """
     Play a game.
@@ -590,8 +669,6 @@ def play_game(li: LICHESS_TYPE,
     :param control_queue: The control queue that contains events (adds `local_game_done` to the queue).
     :param user_profile: Information on our bot.
     :param config: The config that the bot will use.
-    :param challenge_queue: The queue containing the challenges.
-    :param correspondence_queue: The queue containing the correspondence games.
     :param logging_queue: The logging queue. Used by `logging_listener_proc`.
     """
     thread_logging_configurer(logging_queue)
@@ -606,10 +683,10 @@ def play_game(li: LICHESS_TYPE,
     abort_time = seconds(config.abort_time)
     game = model.Game(initial_state, user_profile["username"], li.baseUrl, abort_time)
 
-    with engine_wrapper.create_engine(config, game) as engine:
+    with engine_wrapper.lease_engine(config, game) as engine:
         engine.get_opponent_info(game)
         logger.debug(f"The engine for game {game_id} has pid={engine.get_pid()}")
-        conversation = Conversation(game, li, __version__, challenge_queue)
+        conversation = Conversation(game, li, __version__)
 
         logger.info(f"+++ {game}")
 
@@ -631,8 +708,8 @@ def play_game(li: LICHESS_TYPE,
         goodbye_spectators = get_greeting("goodbye_spectators", config.greeting, keyword_map)
 
         disconnect_time = correspondence_disconnect_time if not game.state.get("moves") else seconds(0)
-        prior_game = None
-        board = chess.Board()
+        prior_snapshot: Optional[model.GameSnapshot] = None
+        board = setup_board(game)
         upd: dict[str, Any] = game.state
         quit_after_all_games_finish = config.quit_after_all_games_finish
         while (not terminated or quit_after_all_games_finish) and not force_quit:
@@ -644,8 +721,8 @@ def play_game(li: LICHESS_TYPE,
                     conversation.react(ChatLine(upd))
                 elif u_type == "gameState":
                     game.state = upd
-                    board = setup_board(game)
-                    if not is_game_over(game) and is_engine_move(game, prior_game, board):
+                    board = update_board(board, game)
+                    if not is_game_over(game) and is_engine_move(game, prior_snapshot, board):
                         disconnect_time = correspondence_disconnect_time
                         say_hello(conversation, hello, hello_spectators, board)
                         setup_timer = Timer()
@@ -672,8 +749,8 @@ def play_game(li: LICHESS_TYPE,
                     wb = "w" if board.turn == chess.WHITE else "b"
                     terminate_time = msec(upd[f"{wb}time"]) + msec(upd[f"{wb}inc"]) + seconds(60)
                     game.ping(abort_time, terminate_time, disconnect_time)
-                    prior_game = copy.deepcopy(game)
-                elif u_type == "ping" and should_exit_game(board, game, prior_game, li, is_correspondence):
+                    prior_snapshot = model.GameSnapshot(game, len(board.move_stack))
+                elif u_type == "ping" and should_exit_game(board, game, prior_snapshot, li, is_correspondence):
                     break
             except (HTTPError, ReadTimeout, RemoteDisconnected, ChunkedEncodingError, ConnectionError, StopIteration) as e:
                 stopped = isinstance(e, StopIteration)
@@ -683,7 +760,7 @@ def play_game(li: LICHESS_TYPE,
                 upd = {}
 
         pgn_record = try_get_pgn_game_record(li, config, game, board, engine)
-    final_queue_entries(control_queue, correspondence_queue, game, is_correspondence, pgn_record)
+    final_queue_entries(control_queue, game, is_correspondence, pgn_record)
 
 
 def get_greeting(greeting: str, greeting_cfg: Configuration, keyword_map: defaultdict[str, str]) -> str:
@@ -737,18 +814,42 @@ def setup_board(game: model.Game) -> chess.Board:
         VariantBoard = find_variant(game.variant_name)
         board = VariantBoard()
 
-    for move in game.state["moves"].split():
+    play_moves(board, game.state["moves"].split())
+    return board
+
+
+def update_board(board: chess.Board, game: model.Game) -> chess.Board:
+    """
+    Bring the board up to date with the moves of the game.
+
+    Only the moves that are not on the board yet are played. If the board does not lead to the game's position (after a
+    takeback, for example), the board is set up again from the start.
+
+    :param board: The board after the last game state.
+    :param game: The game with the new game state.
+    :return: The board of the new game state.
+    """
+    moves = game.state["moves"].split()
+    moves_played = len(board.move_stack)
+    if moves_played > len(moves) or (moves_played > 0 and board.peek().uci() != moves[moves_played - 1]):
+        return setup_board(game)
+
+    play_moves(board, moves[moves_played:])
+    return board
+
+
+def play_moves(board: chess.Board, moves: list[str]) -> None:
+    """Play moves in UCI notation on the board."""
+    for move in moves:
         try:
             board.push_uci(move)
         except ValueError:
             logger.exception(f"Ignoring illegal move {move} on board {board.fen()}")
 
-    return board
-
 
-def is_engine_move(game: model.Game, prior_game: Optional[model.Game], board: chess.Board) -> bool:
+def is_engine_move(game: model.Game, prior_snapshot: Optional[model.GameSnapshot], board: chess.Board) -> bool:
     """Check whether it is the engine's turn."""
-    return game_changed(game, prior_game) and game.is_white == (board.turn == chess.WHITE)
+    return game_changed(game, prior_snapshot, board) and game.is_white == (board.turn == chess.WHITE)
 
 
 def is_game_over(game: model.Game) -> bool:
@@ -757,11 +858,11 @@ def is_game_over(game: model.Game) -> bool:
     return status != "started"
 
 
-def should_exit_game(board: chess.Board, game: model.Game, prior_game: Optional[model.Game], li: LICHESS_TYPE,
-                     is_correspondence: bool) -> bool:
+def should_exit_game(board: chess.Board, game: model.Game, prior_snapshot: Optional[model.GameSnapshot],
+                     li: LICHESS_TYPE, is_correspondence: bool) -> bool:
     """Whether we should exit a game."""
     if (is_correspondence
-            and not is_engine_move(game, prior_game, board)
+            and not is_engine_move(game, prior_snapshot, board)
             and game.should_disconnect_now()):
         return True
     elif game.should_abort_now():
@@ -777,32 +878,34 @@ def should_exit_game(board: chess.Board, game: model.Game, prior_game: Optional[
         return False
 
 
-def final_queue_entries(control_queue: CONTROL_QUEUE_TYPE, correspondence_queue: CORRESPONDENCE_QUEUE_TYPE,
-                        game: model.Game, is_correspondence: bool, pgn_record: str) -> None:
+def final_queue_entries(control_queue: CONTROL_QUEUE_TYPE, game: model.Game, is_correspondence: bool,
+                        pgn_record: str) -> None:
     """
     Log the game that ended or we disconnected from, and sends a `local_game_done` for the game.
 
-     If this is an unfinished correspondence game, put it in a queue to resume later.
+     If this is an unfinished correspondence game, the event asks for it to be resumed later.
     """
-    if is_correspondence and not is_game_over(game):
+    resume = is_correspondence and not is_game_over(game)
+    if resume:
         logger.info(f"--- Disconnecting from {game.url()}")
-        correspondence_queue.put_nowait(game.id)
     else:
         logger.info(f"--- {game.url()} Game over")
 
     control_queue.put_nowait({"type": "local_game_done", "game": {"id": game.id,
                                                                   "pgn": pgn_record,
-                                                                  "complete": is_game_over(game)}})
+                                                                  "complete": is_game_over(game),
+                                                                  "resume": resume}})
 
 
-def game_changed(current_game: model.Game, prior_game: Optional[model.Game]) -> bool:
-    """Check whether the current game state is different from the previous game state."""
-    if prior_game is None:
-        return True
+def game_changed(current_game: model.Game, prior_snapshot: Optional[model.GameSnapshot], board: chess.Board) -> bool:
+    """
+    Check whether a move was played or taken back since the previous game state.
 
-    current_game_moves_str: str = current_game.state["moves"]
-    prior_game_moves_str: str = prior_game.state["moves"]
-    return current_game_moves_str != prior_game_moves_str
+    :param current_game: The game in the current game state.
+    :param prior_snapshot: The snapshot of the previous game state. `None` if there was no previous game state.
+    :param board: The board of the current game state.
+    """
+    return model.GameSnapshot(current_game, len(board.move_stack)).moves_changed(prior_snapshot)
 
 
 def tell_user_game_result(game: model.Game, board: chess.Board) -> None:
@@ -1,10 +1,28 @@
-"""Remove files created when testing lichess-bot."""
+"""Remove files created when testing lichess-bot, and provide the fixtures shared by the tests."""
+import pytest
 import shutil
 import os
-from typing import Any
+from typing import Any, Callable
+from lib import model
+from lib.timer import seconds
 
 
 def pytest_sessionfinish(session: Any, exitstatus: Any) -> None:
     """Remove files created when testing lichess-bot."""
     if os.path.exists("TEMP") and not os.getenv("GITHUB_ACTIONS"):
         shutil.rmtree("TEMP")
+
+
+@pytest.fixture
+def new_game() -> Callable[..., model.Game]:
+    """Get a function that makes a game of standard chess between bo (the bot, playing white) and b."""
+    def make_game(game_id: str = "zzzzzzzz", moves: str = "") -> model.Game:
+        game_info = {"id": game_id,
+                     "variant": {"name": "Standard"},
+                     "white": {"name": "bo"},
+                     "black": {"name": "b"},
+                     "state": {"moves": moves},
+                     "createdAt": 0}
+        return model.Game(game_info, "bo", "https://lichess.org/", seconds(20))
+
+    return make_game
@@ -95,7 +95,8 @@ def lichess_org_simulator(opponent_path: str,
                           move_queue: Queue[Optional[chess.Move]],
                           board_queue: Queue[chess.Board],
                           clock_queue: Queue[tuple[datetime.timedelta, datetime.timedelta, datetime.timedelta]],
-                          results: Queue[bool]) -> None:
+                          results: Queue[bool],
+                          opponent_moved: threading.Event) -> None:
     """
     Run a mocked version of the lichess.org server to provide an opponent for a test. This opponent always plays white.
 
@@ -104,6 +105,8 @@ def lichess_org_simulator(opponent_path: str,
     :param board_queue: An interprocess queue where this function sends the updated board after choosing a move.
     :param clock_queue: An interprocess queue where this function sends the updated game clock after choosing a move.
     :param results: An interprocess queue where this function sends the result of the game to the testing function.
+    :param opponent_moved: Set once the opponent has made its first move. lichess-bot must not start its processes before
+    then, since a process forked while the opponent is starting or thinking could inherit its pipes or a held logging lock.
     """
     start_time = seconds(10)
     increment = seconds(0.1)
@@ -138,6 +141,7 @@ def lichess_org_simulator(opponent_path: str,
             board.push(engine_move)
             board_queue.put(board)
             clock_queue.put((wtime, btime, increment))
+            opponent_moved.set()
         else:
             move_timer = Timer()
             while (bot_move := move_queue.get()) is None:
@@ -182,8 +186,12 @@ def run_bot(raw_config: dict[str, Any], logging_level: int, opponent_path: str =
     lichess_bot.disable_restart()
 
     results: Queue[bool] = manager.Queue()
-    thr = threading.Thread(target=lichess_org_simulator, args=[opponent_path, move_queue, board_queue, clock_queue, results])
+    opponent_moved = threading.Event()
+    thr = threading.Thread(target=lichess_org_simulator,
+                           args=[opponent_path, move_queue, board_queue, clock_queue, results, opponent_moved])
     thr.start()
+    while not opponent_moved.wait(timeout=1):
+        assert thr.is_alive(), "The opponent stopped before making its first move."
     lichess_bot.start(li, user_profile, CONFIG, logging_level, testing_log_file_name, None, one_game=True)
 
     result = results.get()
@@ -0,0 +1,174 @@
+"""Test the homemade ChessAi engine."""
+import random
+import threading
+import chess
+import chess.engine
+import pytest
+from engines import BitboardEvaluation
+from engines.ChessAi import ChessAi
+from engines.OpeningCache import OpeningCache
+from engines.IncrementalEvaluator import IncrementalEvaluator, evaluate
+from engines.TranspositionTable import TranspositionTable, EXACT, LOWER_BOUND
+
+
+def test_transposition_table_replacement() -> None:
+    """Test that the transposition table keeps deeper results from the current search."""
+    table = TranspositionTable(0)
+    assert table.size == 1
+    e4 = chess.Move.from_uci("e2e4")
+    d4 = chess.Move.from_uci("d2d4")
+
+    table.store(1, 5, EXACT, 10, e4)
+    table.store(2, 3, EXACT, 20, d4)
+    assert table.probe(2) is None
+    assert table.probe(1) == (1, 5, EXACT, 10, e4, 0)
+
+    # A result for the same position is always stored, and keeps the old move if it has none.
+    table.store(1, 2, LOWER_BOUND, 30, None)
+    assert table.probe(1) == (1, 2, LOWER_BOUND, 30, e4, 0)
+
+    # An equal or deeper result replaces another position.
+    table.store(2, 2, EXACT, 20, d4)
+    assert table.probe(1) is None
+    assert table.probe(2) == (2, 2, EXACT, 20, d4, 0)
+
+    # Results from an earlier search are replaced first.
+    table.store(3, 9, EXACT, 0, e4)
+    table.new_search()
+    table.store(4, 1, EXACT, 0, d4)
+    assert table.probe(3) is None
+    assert table.probe(4) == (4, 1, EXACT, 0, d4, 1)
+    assert table.hashfull() == 1000
+
+    table.clear()
+    assert table.probe(4) is None
+    assert table.hashfull() == 0
+
+
+def test_incremental_evaluation() -> None:
+    """Test that the incremental score matches a full evaluation over random games."""
+    rng = random.Random(0)
+    special_moves = {"castling": 0, "en passant": 0, "promotion": 0}
+    for game in range(40):
+        board = chess.Board.from_chess960_pos(rng.randrange(960)) if game % 2 else chess.Board()
+        evaluator = IncrementalEvaluator(board)
+        scores = [evaluator.score]
+        while not board.is_game_over() and len(board.move_stack) < 300:
+            moves = list(board.legal_moves)
+            # Prefer castling, en passant and promotions so every kind of move is checked.
+            special = [move for move in moves if board.is_castling(move) or board.is_en_passant(move) or move.promotion]
+            move = rng.choice(special if special and rng.random() < 0.5 else moves)
+            special_moves["castling"] += board.is_castling(move)
+            special_moves["en passant"] += board.is_en_passant(move)
+            special_moves["promotion"] += bool(move.promotion)
+            evaluator.push(board, move)
+            assert evaluator.score == evaluate(board), board.fen()
+            scores.append(evaluator.score)
+
+        while board.move_stack:
+            scores.pop()
+            evaluator.pop(board)
+            assert evaluator.score == scores[-1]
+        assert evaluator.history == []
+
+    assert all(special_moves.values()), special_moves
+
+
+def random_positions(count: int) -> list[chess.Board]:
+    """Play random moves from the starting position and keep every tenth position."""
+    rng = random.Random(1)
+    boards: list[chess.Board] = []
+    board = chess.Board()
+    while len(boards) < count:
+        if board.is_game_over():
+            board = chess.Board()
+        board.push(rng.choice(list(board.legal_moves)))
+        if len(board.move_stack) % 10 == 0:
+            boards.append(board.copy(stack=False))
+    return boards
+
+
+def test_positional_evaluation() -> None:
+    """Test that the positional terms are symmetric and that the batch evaluation matches them."""
+    boards = random_positions(100)
+    for board in boards:
+        assert BitboardEvaluation.positional_score(board.mirror()) == -BitboardEvaluation.positional_score(board)
+
+    # Three passed white pawns and a black king with no shield.
+    assert BitboardEvaluation.positional_score(chess.Board("4k3/8/8/8/8/8/PPP5/4K3 w - - 0 1")) > 0
+
+    pytest.importorskip("numpy")
+    batch_scores = BitboardEvaluation.evaluate_batch([BitboardEvaluation.board_bitboards(board) for board in boards])
+    assert list(batch_scores) == [BitboardEvaluation.evaluate_position(board) for board in boards]
+
+
+def test_draw_by_rule() -> None:
+    """Test that a position drawn by insufficient material is scored as a draw and still gets a move."""
+    board = chess.Board("8/8/4k3/8/8/3NK3/8/8 w - - 0 1")
+    chess_ai = ChessAi()
+    move = chess_ai.get_move(board, chess.engine.Limit(depth=3))
+    assert board.is_legal(move)
+    assert chess_ai.info["pv"] == [move]
+    assert chess_ai.info["score"] == chess.engine.PovScore(chess.engine.Cp(0), chess.WHITE)
+
+
+def test_cached_depth() -> None:
+    """Test that moves from the opening cache and the mate cache report the depth of the search they come from."""
+    opening_cache = OpeningCache(size_mb=0.01, min_depth=2)
+    board = chess.Board()
+    ChessAi(opening_cache=opening_cache).get_move(board, chess.engine.Limit(depth=3))
+    chess_ai = ChessAi(opening_cache=opening_cache)
+    chess_ai.get_move(board, chess.engine.Limit(depth=2))
+    assert chess_ai.nodes == 0
+    assert chess_ai.info["depth"] == 3
+
+    board = chess.Board("7k/8/5K2/8/8/8/8/R7 w - - 0 1")
+    chess_ai = ChessAi()
+    board.push(chess_ai.get_move(board, chess.engine.Limit(depth=5)))
+    search_depth = chess_ai.info["depth"]
+    board.push(chess_ai.info["pv"][1])
+    chess_ai.get_move(board, chess.engine.Limit(depth=5))
+    assert chess_ai.nodes == 0
+    assert chess_ai.info["depth"] == search_depth - 2
+
+
+def test_ponder_keeps_move_ordering(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that pondering does not change the move ordering the next search ages from."""
+    chess_ai = ChessAi()
+    board = chess.Board()
+    board.push(chess_ai.get_move(board, chess.engine.Limit(depth=4)))
+    assert chess_ai.ponder_move is not None
+    search_position = chess_ai.search_position
+    history = [list(color_history) for color_history in chess_ai.history]
+    assert any(map(any, history))
+
+    ponder_board = board.copy()
+    ponder_board.push(chess_ai.ponder_move)
+    stop = threading.Event()
+    stop.set()
+    chess_ai.ponder(ponder_board, stop)
+    assert chess_ai.search_position == search_position
+    assert chess_ai.history == history
+
+    # After another reply than the expected one, the move ordering is aged, not cleared.
+    def clear_move_ordering() -> None:
+        raise AssertionError("The move ordering was cleared.")
+
+    monkeypatch.setattr(chess_ai, "clear_move_ordering", clear_move_ordering)
+    board.push(next(move for move in board.legal_moves if move != chess_ai.ponder_move))
+    chess_ai.get_move(board, chess.engine.Limit(depth=3))
+
+
+def test_score_of_side_to_move() -> None:
+    """Test that the score is reported from the side to move, as lichess-bot reads it."""
+    board = chess.Board("3qk3/8/8/8/8/8/8/4K3 b - - 0 1")
+    chess_ai = ChessAi()
+    chess_ai.get_move(board, chess.engine.Limit(depth=2))
+    score = chess_ai.info["score"]
+    assert score.turn == chess.BLACK
+    assert score.relative > chess.engine.Cp(500)
+    assert score.white() < chess.engine.Cp(-500)
+
+    board = chess.Board("7k/8/8/8/8/1r6/r7/7K b - - 0 1")
+    chess_ai.get_move(board, chess.engine.Limit(depth=2))
+    assert chess_ai.info["score"].relative == chess.engine.Mate(1)
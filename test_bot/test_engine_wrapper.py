@@ -0,0 +1,129 @@
+"""Test the engines that lichess-bot keeps running between games."""
+import chess
+import chess.engine
+import pathlib
+import pytest
+import stat
+import sys
+import yaml
+from typing import Any, Callable
+from lib import config, engine_wrapper, model
+from lib.engine_wrapper import lease_engine, quit_idle_engines, quit_warm_engines, warm_engines
+from lib.timer import seconds
+
+
+def bot_config(protocol: str, name: str, engine_dir: str = "./engines/") -> config.Configuration:
+    """Get a config that plays with the engine `name`."""
+    with open("./config.yml.default") as file:
+        raw_config = yaml.safe_load(file)
+    raw_config["token"] = ""
+    raw_config["engine"]["protocol"] = protocol
+    raw_config["engine"]["name"] = name
+    raw_config["engine"]["dir"] = engine_dir
+    # The UCI test engine has no options.
+    raw_config["engine"]["uci_options"] = {}
+    config.insert_default_values(raw_config)
+    return config.Configuration(raw_config)
+
+
+def homemade_config() -> config.Configuration:
+    """Get a config that plays with the RandomMove homemade engine."""
+    return bot_config("homemade", "RandomMove")
+
+
+# A UCI engine that writes the commands it gets to commands.txt, and ponders until it is told to stop.
+PONDERING_ENGINE = """
+import sys
+with open(sys.argv[0] + ".commands.txt", "w") as log:
+    for line in sys.stdin:
+        command = line.split()
+        log.write(line)
+        log.flush()
+        if command == ["uci"]:
+            print("uciok", flush=True)
+        elif command == ["isready"]:
+            print("readyok", flush=True)
+        elif command[:1] == ["go"] and "ponder" not in command:
+            print("bestmove e2e4 ponder e7e5", flush=True)
+        elif command == ["stop"]:
+            print("bestmove g1f3", flush=True)
+        elif command == ["quit"]:
+            break
+"""
+
+
+def test_lease_engine(monkeypatch: pytest.MonkeyPatch, new_game: Callable[..., model.Game]) -> None:
+    """Test that the engine is reused by the next game, and replaced when it fails."""
+    engine_config = homemade_config()
+    new_game_ids = []
+    with lease_engine(engine_config, new_game("game1")) as engine:
+        first_engine = engine
+        monkeypatch.setattr(engine, "new_game", lambda game: new_game_ids.append(game.id))
+    with lease_engine(engine_config, new_game("game2")) as engine:
+        assert engine is first_engine
+    assert new_game_ids == ["game2"]
+
+    # An engine that does not answer when a new game starts is replaced.
+    def fail(*args: Any) -> None:
+        raise RuntimeError("The engine crashed.")
+
+    monkeypatch.setattr(first_engine, "new_game", fail)
+    with lease_engine(engine_config, new_game("game3")) as engine:
+        second_engine = engine
+    assert second_engine is not first_engine
+
+    # An engine that leaves a game with an exception is shut down instead of being kept.
+    with pytest.raises(RuntimeError):
+        with lease_engine(engine_config, new_game("game4")) as engine:
+            assert engine is second_engine
+            raise RuntimeError("The game failed.")
+    with lease_engine(engine_config, new_game("game5")) as engine:
+        assert engine is not second_engine
+
+    quit_warm_engines()
+    assert not warm_engines
+
+
+def test_idle_engines(monkeypatch: pytest.MonkeyPatch, new_game: Callable[..., model.Game]) -> None:
+    """Test that games played at once get their own engines, and that engines waiting too long are shut down."""
+    engine_config = homemade_config()
+    with lease_engine(engine_config, new_game("game1")) as engine1:
+        with lease_engine(engine_config, new_game("game2")) as engine2:
+            assert engine1 is not engine2
+    assert [engine for engine, _ in warm_engines] == [engine2, engine1]
+
+    # The engine that finished a game most recently is lent first.
+    with lease_engine(engine_config, new_game("game3")) as engine:
+        assert engine is engine1
+
+    quit_idle_engines()
+    assert len(warm_engines) == 2
+
+    monkeypatch.setattr(engine_wrapper, "ENGINE_IDLE_TIMEOUT", seconds(0))
+    with lease_engine(engine_config, new_game("game4")) as engine:
+        assert engine is engine1
+    quit_idle_engines()
+    assert [engine for engine, _ in warm_engines] == [engine2]
+
+    quit_warm_engines()
+    assert not warm_engines
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="The test engine is a Python script run through its shebang line.")
+def test_stop_pondering_after_game(tmp_path: pathlib.Path, new_game: Callable[..., model.Game]) -> None:
+    """Test that an engine pondering when its game ends is stopped before it waits for the next game."""
+    engine_path = tmp_path / "pondering_engine"
+    engine_path.write_text(f"#!{sys.executable}\n{PONDERING_ENGINE}")
+    engine_path.chmod(engine_path.stat().st_mode | stat.S_IEXEC)
+    commands_path = tmp_path / "pondering_engine.commands.txt"
+
+    with lease_engine(bot_config("uci", engine_path.name, str(tmp_path)), new_game("game1")) as engine:
+        result = engine.engine.play(chess.Board(), chess.engine.Limit(time=1), ponder=True)
+        assert result.ponder == chess.Move.from_uci("e7e5")
+        assert commands_path.read_text().splitlines()[-1].startswith("go ponder")
+    commands = commands_path.read_text().splitlines()
+    assert commands[-2:] == ["stop", "isready"]
+    assert [engine for engine, _ in warm_engines] == [engine]
+
+    quit_warm_engines()
+    assert not warm_engines
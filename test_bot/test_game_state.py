@@ -0,0 +1,50 @@
+"""Test how lichess-bot follows the state of a game."""
+import importlib
+import chess
+from typing import Callable
+from lib import model
+lichess_bot = importlib.import_module("lichess-bot")
+
+
+def test_update_board(new_game: Callable[..., model.Game]) -> None:
+    """Test that the board follows the moves of the game, including takebacks."""
+    game = new_game()
+    board: chess.Board = lichess_bot.setup_board(game)
+
+    def update(moves: str) -> chess.Board:
+        game.state["moves"] = moves
+        new_board: chess.Board = lichess_bot.update_board(board, game)
+        return new_board
+
+    def played(board: chess.Board) -> str:
+        return " ".join(move.uci() for move in board.move_stack)
+
+    # New moves are played on the same board.
+    assert update("e2e4 e7e5") is board
+    assert update("e2e4 e7e5 g1f3") is board
+    assert played(board) == "e2e4 e7e5 g1f3"
+
+    # A takeback sets up the board again.
+    board = update("e2e4 e7e5")
+    assert played(board) == "e2e4 e7e5"
+
+    # A takeback followed by a different move leaves as many moves as before, but not the same ones.
+    board = update("e2e4 e7e5 g1f3")
+    board = update("e2e4 e7e5 b1c3")
+    assert played(board) == "e2e4 e7e5 b1c3"
+    board = update("e2e4 c7c5")
+    assert played(board) == "e2e4 c7c5"
+    assert board == chess.Board("rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq c6 0 2")
+
+
+def test_game_snapshot(new_game: Callable[..., model.Game]) -> None:
+    """Test that a snapshot tells when a move was played or taken back."""
+    game = new_game(moves="e2e4 e7e5")
+    snapshot = model.GameSnapshot(game, 2)
+    assert snapshot.moves_changed(None)
+    assert not model.GameSnapshot(game, 2).moves_changed(snapshot)
+
+    game.state["moves"] = "e2e4 c7c5"
+    assert model.GameSnapshot(game, 2).moves_changed(snapshot)
+    game.state["moves"] = "e2e4"
+    assert model.GameSnapshot(game, 1).moves_changed(snapshot)
@@ -0,0 +1,68 @@
+"""Test the opening cache of ChessAi."""
+import chess
+import pathlib
+import pytest
+from engines.OpeningCache import (OpeningCache, OpeningCacheEntry, pack_data, unpack_data, BUCKET_SIZE, MAX_COUNT,
+                                  MAX_DEPTH, MAX_SCORE)
+
+
+def test_pack_data() -> None:
+    """Test that entries survive packing, and that out of range values are clamped."""
+    entries = [OpeningCacheEntry(chess.Move.from_uci("e2e4"), chess.Move.from_uci("e7e5"), 35, 8, 3),
+               OpeningCacheEntry(chess.Move.from_uci("a7a8q"), None, -MAX_SCORE, 1, 1),
+               OpeningCacheEntry(None, None, 0, 0, 1),
+               OpeningCacheEntry(chess.Move.from_uci("h2h1n"), chess.Move.from_uci("b8c6"), MAX_SCORE, MAX_DEPTH, MAX_COUNT)]
+    for entry in entries:
+        assert unpack_data(pack_data(entry)) == entry
+
+    clamped = unpack_data(pack_data(OpeningCacheEntry(None, None, 10 * MAX_SCORE, 1000, 1000)))
+    assert clamped == (None, None, MAX_SCORE, MAX_DEPTH, MAX_COUNT)
+    assert unpack_data(pack_data(OpeningCacheEntry(None, None, -10 * MAX_SCORE, 1, 1))).score == -MAX_SCORE
+
+
+def test_bucket_replacement() -> None:
+    """Test that a full bucket replaces the position searched the fewest times, then the shallowest one."""
+    cache = OpeningCache(size_mb=0)
+    assert cache.slots == BUCKET_SIZE
+    move = chess.Move.from_uci("e2e4")
+    for key in range(1, BUCKET_SIZE + 1):
+        cache.write(key, OpeningCacheEntry(move, None, 0, key, 5))
+    cache.write(3, OpeningCacheEntry(move, None, 0, 3, 1))
+    assert len(cache) == BUCKET_SIZE
+
+    cache.write(100, OpeningCacheEntry(move, None, 0, 1, 2))
+    assert cache.read(3) is None
+    cache.write(101, OpeningCacheEntry(move, None, 0, 3, 5))
+    assert cache.read(100) is None
+    cache.write(102, OpeningCacheEntry(move, None, 0, 9, 5))
+    assert cache.read(1) is None
+    assert [cache.read(key) is not None for key in (2, 4, 101, 102)] == [True] * 4
+
+    # Writing a stored position replaces its own slot.
+    cache.write(102, OpeningCacheEntry(move, None, 10, 9, 6))
+    assert cache.read(102) == (move, None, 10, 9, 6)
+    assert len(cache) == BUCKET_SIZE
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_file(tmp_path: pathlib.Path) -> None:
+    """Test that a cache file keeps its results and size, and that other files are refused."""
+    path = str(tmp_path / "openings.bin")
+    board = chess.Board()
+    cache = OpeningCache(path, size_mb=0.01, min_depth=2)
+    cache.store(board, [chess.Move.from_uci("d2d4"), chess.Move.from_uci("d7d5")], 20, 6)
+    slots = cache.slots
+    cache.close()
+
+    cache = OpeningCache(path, size_mb=1, min_depth=2)
+    assert cache.slots == slots
+    assert cache.probe(board) == (chess.Move.from_uci("d2d4"), chess.Move.from_uci("d7d5"), 20, 6, 1)
+    assert cache.probe(board, 7) is None
+    cache.close()
+
+    not_a_cache = tmp_path / "book.bin"
+    not_a_cache.write_bytes(b"not a cache")
+    with pytest.raises(ValueError):
+        OpeningCache(str(not_a_cache))
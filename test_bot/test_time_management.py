@@ -0,0 +1,63 @@
+"""Test the time budgets of homemade engines."""
+import chess
+import chess.engine
+import pytest
+from lib.time_management import TimeManager, position_complexity
+
+
+def test_no_clock() -> None:
+    """Test that a search without a clock gets no time limit, and a fixed time per move gets that time."""
+    manager = TimeManager()
+    board = chess.Board()
+    budget = manager.budget(board, None)
+    assert (budget.soft, budget.hard, budget.panic) == (None, None, False)
+    budget = manager.budget(board, chess.engine.Limit(depth=5))
+    assert (budget.soft, budget.hard) == (None, None)
+    budget = manager.budget(board, chess.engine.Limit(time=2.5))
+    assert (budget.soft, budget.hard) == (2.5, 2.5)
+
+
+def test_soft_and_hard_limits() -> None:
+    """Test the soft and hard limits of a move with plenty of time on the clock."""
+    manager = TimeManager()
+    board = chess.Board()
+    time_limit = chess.engine.Limit(white_clock=60, black_clock=10, white_inc=2, black_inc=0)
+    budget = manager.budget(board, time_limit, complexity=1.0)
+    # 60 s over 40 moves, plus three quarters of the increment.
+    assert budget.soft == pytest.approx(1.5 + 1.5)
+    assert budget.hard == pytest.approx(3 * 3)
+    assert not budget.panic
+
+    # The budget follows the clock of the side to move and scales with the complexity of the position.
+    board.push_uci("e2e4")
+    black_budget = manager.budget(board, time_limit, complexity=2.0)
+    assert black_budget.soft == pytest.approx(2 * 10 / 40)
+    assert black_budget.hard == pytest.approx(3 * 10 / 40)
+
+    # Never more than half of the clock on one move.
+    budget = manager.budget(chess.Board(), chess.engine.Limit(white_clock=60, remaining_moves=1), complexity=1.0)
+    assert budget.soft == budget.hard == pytest.approx(30)
+
+
+def test_panic() -> None:
+    """Test that a low clock cuts the budget to living off the increment."""
+    manager = TimeManager()
+    board = chess.Board()
+    budget = manager.budget(board, chess.engine.Limit(white_clock=4, white_inc=1), complexity=1.0)
+    assert budget.panic
+    assert budget.soft == pytest.approx(4 / 80 + 0.75 / 2)
+    assert budget.hard == pytest.approx(2 * (4 / 80 + 0.75 / 2))
+
+    budget = manager.budget(board, chess.engine.Limit(white_clock=0.001), complexity=1.0)
+    assert budget.panic
+    assert budget.soft == budget.hard == manager.min_time
+
+
+def test_position_complexity() -> None:
+    """Test that forced moves get no time and positions with captures get more."""
+    assert position_complexity(chess.Board("k7/8/8/8/8/8/1r6/K7 w - - 0 1")) == 0
+    quiet = position_complexity(chess.Board())
+    sharp = position_complexity(chess.Board("rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2"))
+    assert 0 < quiet < sharp
+    budget = TimeManager().budget(chess.Board("k7/8/8/8/8/8/1r6/K7 w - - 0 1"), chess.engine.Limit(white_clock=60))
+    assert budget.soft == TimeManager().min_time